@@ -1,20 +1,93 @@
 from __future__ import annotations
 
+import math
 import os
+import random
 import sys
+import time
 import click
-from typing import Dict, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from email.message import EmailMessage
-from email.utils import parsedate_to_datetime
+from email.utils import getaddresses, parsedate_to_datetime
 from dotenv import load_dotenv
 
-from .imap_reader import IMAPReader, env_bool
+from .imap_reader import HEADER_FETCH_BATCH, IMAPReader, env_bool
+from .lease import DEFAULT_LEASE_TTL, LeaseManager
+from .prefilter import DEFAULT_RULES, ROUTE_LOCAL, ROUTE_SKIP, Prefilter
 from .forward_parser import get_original_message_and_headers
-from .body_extractor import extract_text
-from .openai_client import OpenAIEmailProcessor
-from .file_store import write_email_json
+from .openai_client import MIN_ANALYZE_BUDGET, OpenAIEmailProcessor, request_timeout_within
+from .file_store import plan_email_path, write_email_json
+from .journal import STAGE_ANALYZED, STAGE_DONE, STAGE_WRITTEN, ProgressJournal
 from .models import EmailOutput
 
+# Share of the lease TTL a worker's analyze() may use; the rest covers renewals
+LEASE_ANALYZE_SHARE = 0.9
+
+
+def _local_output(headers: Dict[str, str]) -> EmailOutput:
+    """Output built from headers only, for messages routed away from OpenAI."""
+    to = [f"{name} <{addr}>" if name else addr for name, addr in getaddresses([headers.get("To", "")]) if addr]
+    return EmailOutput.model_validate({"from": headers.get("From"), "to": to})
+
+
+def _with_headers(
+    reader: IMAPReader,
+    uids: List[bytes],
+    fetch: bool,
+    batch_size: int = HEADER_FETCH_BATCH,
+    done: Callable[[], bool] = lambda: False,
+) -> Iterator[Tuple[bytes, Optional[EmailMessage], Optional[int]]]:
+    """
+    Yields (uid, headers, size), fetching headers one batch at a time as the
+    caller advances. Stops before fetching another batch once done() is true,
+    so a run that stops early never downloads the rest.
+    """
+    for i in range(0, len(uids), batch_size):
+        if done():
+            return
+        batch = uids[i:i + batch_size]
+        header_info: Dict[bytes, Tuple[EmailMessage, Optional[int]]] = {}
+        if fetch:
+            try:
+                header_info = reader.fetch_headers(batch)
+            except Exception as e:
+                # Without headers these messages take the default route
+                click.echo(f"Error fetching headers: {e}", err=True)
+        for uid in batch:
+            headers, size = header_info.get(uid, (None, None))
+            yield uid, headers, size
+
+
+def _resume_from_journal(
+    journal: ProgressJournal,
+    reader: IMAPReader,
+    uidvalidity: int,
+    mark_seen: bool,
+) -> None:
+    """Finish messages a previous run analyzed but did not fully commit."""
+    pending = journal.pending()
+    if pending:
+        click.echo(f"Resuming {len(pending)} half-committed message(s) from journal")
+    for entry in pending:
+        try:
+            if entry.stage == STAGE_ANALYZED and entry.result is not None:
+                out_path = write_email_json(
+                    entry.result, fallback_header_date=entry.fallback_date, path=entry.out_path
+                )
+                journal.set_stage(entry.uidvalidity, entry.uid, STAGE_WRITTEN)
+                click.echo(f"Recovered UID {entry.uid.decode()}: {out_path}")
+            if mark_seen:
+                if entry.uidvalidity == uidvalidity:
+                    reader.mark_seen(entry.uid)
+                else:
+                    click.echo(
+                        f"UIDVALIDITY changed; cannot mark old UID {entry.uid.decode()} as seen", err=True
+                    )
+            journal.set_stage(entry.uidvalidity, entry.uid, STAGE_DONE)
+        except Exception as e:
+            click.echo(f"Error resuming UID {entry.uid.decode()}: {e}", err=True)
+            continue
+
 
 @click.group()
 def cli() -> None:
@@ -23,7 +96,13 @@ def cli() -> None:
 
 @cli.command()
 @click.option("--limit", type=int, default=None, help="Limit number of emails to process")
-def run(limit: Optional[int]) -> None:
+@click.option(
+    "--worker-id",
+    type=str,
+    default=None,
+    help="Run as a worker sharing the folder with others; UIDs are claimed via IMAP lease keywords",
+)
+def run(limit: Optional[int], worker_id: Optional[str]) -> None:
     """Process unread emails and write per-email JSON files."""
     load_dotenv()
     host = os.getenv("IMAP_HOST", "localhost")
@@ -44,18 +123,93 @@ def run(limit: Optional[int]) -> None:
         sys.exit(1)
 
     mark_seen = env_bool("MARK_SEEN", True)
+    prefilter: Optional[Prefilter] = None
+    if env_bool("PREFILTER", True):
+        rules_path = os.getenv("PREFILTER_RULES")
+        prefilter = Prefilter.from_file(rules_path) if rules_path else Prefilter(DEFAULT_RULES)
+    worker_id = worker_id or os.getenv("WORKER_ID") or None
+    lease_ttl = DEFAULT_LEASE_TTL
+    env_lease_ttl = os.getenv("LEASE_TTL")
+    if env_lease_ttl:
+        try:
+            lease_ttl = int(env_lease_ttl)
+        except ValueError:
+            pass
+        if lease_ttl <= 0:
+            lease_ttl = DEFAULT_LEASE_TTL
+    if worker_id and not mark_seen:
+        click.echo("Worker mode requires MARK_SEEN; released messages would be reprocessed", err=True)
+        sys.exit(1)
+    min_lease_ttl = math.ceil(MIN_ANALYZE_BUDGET / LEASE_ANALYZE_SHARE)
+    if worker_id and lease_ttl < min_lease_ttl:
+        click.echo(
+            f"LEASE_TTL {lease_ttl}s is too short for a retried OpenAI call; using {min_lease_ttl}s", err=True
+        )
+        lease_ttl = min_lease_ttl
 
     reader = IMAPReader(host, port, ssl, username, password, folder)
+    journal = ProgressJournal(folder, os.getenv("JOURNAL_PATH") or None)
     processor: Optional[OpenAIEmailProcessor] = None
+    leases: Optional[LeaseManager] = None
 
     try:
         reader.connect()
-        uids = reader.search_unseen(limit=limit)
+        uidvalidity = reader.uidvalidity or 0
+        # Complete interrupted work before fetching anything new
+        _resume_from_journal(journal, reader, uidvalidity, mark_seen)
+        if mark_seen:
+            # Without MARK_SEEN the done rows are what keeps old UIDs from being reprocessed
+            journal.prune_done()
+        if worker_id:
+            leases = LeaseManager(reader, worker_id, ttl=lease_ttl)
+            # Claims happen per message, so the limit applies to claimed UIDs
+            uids = reader.search_unseen()
+            # Spread workers over the mailbox instead of racing for the same UIDs
+            random.shuffle(uids)
+        else:
+            uids = reader.search_unseen(limit=limit)
         click.echo(f"Found {len(uids)} unread message(s) in {folder}")
-        for uid in uids:
+        # Already analyzed by an earlier run; resume owns those from here
+        uids = [uid for uid in uids if journal.get_stage(uidvalidity, uid) is None]
+        batch_size = HEADER_FETCH_BATCH
+        if leases is not None and limit is not None:
+            # Some claims will fail, but most of a full batch would be wasted I/O
+            batch_size = max(1, min(batch_size, limit))
+        claimed = 0
+
+        def limit_reached() -> bool:
+            return leases is not None and limit is not None and claimed >= limit
+
+        # Headers only, fetched lazily; bodies are fetched later for messages that are not skipped
+        for uid, msg_headers, size in _with_headers(
+            reader, uids, prefilter is not None, batch_size, done=limit_reached
+        ):
+            if limit_reached():
+                break
+            started = time.perf_counter()
+            route = None
+            if prefilter is not None:
+                try:
+                    route = prefilter.route(msg_headers, size)
+                except Exception as e:
+                    click.echo(f"Error pre-filtering UID {uid.decode()}: {e}", err=True)
+                    route = prefilter.default
+                if route == ROUTE_SKIP:
+                    try:
+                        if mark_seen:
+                            reader.mark_seen(uid)
+                    except Exception as e:
+                        click.echo(f"Error marking skipped UID {uid.decode()}: {e}", err=True)
+                    continue
+            lease = None
+            if leases is not None:
+                lease = leases.claim(uid)
+                if lease is None:
+                    continue
+                claimed += 1
             try:
                 msg = reader.fetch_message(uid)
-                original_msg, inline_headers, cleaned_text, method = get_original_message_and_headers(msg)
+                original_msg, inline_headers, body_text, method = get_original_message_and_headers(msg)
 
                 # Construct headers from chosen source
                 headers: Dict[str, str] = {}
@@ -82,17 +236,22 @@ def run(limit: Optional[int]) -> None:
                         if v:
                             headers[k] = v
 
-                # Extract text body from appropriate source
-                if cleaned_text is not None:
-                    body_text = cleaned_text
+                result: EmailOutput
+                if route == ROUTE_LOCAL:
+                    result = _local_output(headers)
                 else:
-                    body_text = extract_text(original_msg)
-
-                # Build OpenAI processor when first needed
-                if processor is None:
-                    processor = OpenAIEmailProcessor()
-
-                result: EmailOutput = processor.analyze(headers, body_text)
+                    if lease is not None:
+                        # Start analyze on a full TTL; fetch and parsing may have used part of it
+                        lease = leases.renew(lease)
+                        if lease is None:
+                            click.echo(f"Lost lease on UID {uid.decode()}; leaving it to the new owner", err=True)
+                            continue
+                    # Build OpenAI processor when first needed
+                    if processor is None:
+                        # In worker mode a retried request must not outlive the lease
+                        timeout = request_timeout_within(lease_ttl * LEASE_ANALYZE_SHARE) if leases is not None else None
+                        processor = OpenAIEmailProcessor(timeout=timeout)
+                    result = processor.analyze(headers, body_text)
 
                 # Fill missing fields from headers/body
                 if not result.subject:
@@ -105,16 +264,40 @@ def run(limit: Optional[int]) -> None:
                     # Include the body_text as fallback
                     result.text = body_text
 
-                out_path = write_email_json(result, fallback_header_date=headers.get("Date"))
-                click.echo(f"Processed UID {uid.decode()}: {out_path}")
+                if lease is not None:
+                    # A late worker must not write or mark a message its new owner is processing
+                    lease = leases.renew(lease)
+                    if lease is None:
+                        click.echo(f"Lost lease on UID {uid.decode()}; dropping the result", err=True)
+                        continue
+
+                # Journal the result before any side effect so a crash never re-bills it
+                out_path = plan_email_path(result, fallback_header_date=headers.get("Date"))
+                journal.record_analyzed(uidvalidity, uid, result, headers.get("Date"), out_path)
+                write_email_json(result, fallback_header_date=headers.get("Date"), path=out_path)
+                journal.set_stage(uidvalidity, uid, STAGE_WRITTEN)
+                click.echo(f"Processed UID {uid.decode()}: {out_path} ({time.perf_counter() - started:.3f}s)")
 
                 if mark_seen:
                     reader.mark_seen(uid)
+                journal.set_stage(uidvalidity, uid, STAGE_DONE)
             except Exception as e:
                 click.echo(f"Error processing UID {uid.decode()}: {e}", err=True)
                 continue
+            finally:
+                if lease is not None:
+                    try:
+                        leases.release(lease)
+                    except Exception as e:
+                        # The lease expires on its own; another worker will reclaim it
+                        click.echo(f"Failed to release lease on UID {uid.decode()}: {e}", err=True)
+        if prefilter is not None and prefilter.counts:
+            click.echo("Pre-filter summary:")
+            for line in prefilter.summary():
+                click.echo(f"  {line}")
     finally:
         reader.close()
+        journal.close()
 
 
 if __name__ == "__main__":
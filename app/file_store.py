@@ -72,31 +72,56 @@ def pick_filename(ts: str, message_id: Optional[str]) -> str:
     sanitized = sanitize_message_id(message_id)
     if not sanitized:
         sanitized = stable_hash(ts)
-    base = f"{ts}_{sanitized}.json"
-    path = os.path.join(EMAILS_DIR, base)
-    if not os.path.exists(path):
-        return path
+    path = os.path.join(EMAILS_DIR, f"{ts}_{sanitized}.json")
     # de-dup with suffix
-    i = 1
+    i = 0
     while True:
-        alt = os.path.join(EMAILS_DIR, f"{ts}_{sanitized}-{i}.json")
-        if not os.path.exists(alt):
-            return alt
+        if _reserve(path):
+            return path
         i += 1
+        path = os.path.join(EMAILS_DIR, f"{ts}_{sanitized}-{i}.json")
 
 
-def write_email_json(
+def _reserve(path: str) -> bool:
+    """
+    Creates an empty placeholder unless the file exists. O_EXCL makes this
+    atomic, so concurrent workers never pick the same name.
+    """
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    except FileExistsError:
+        return False
+    os.close(fd)
+    return True
+
+
+def plan_email_path(
     output: EmailOutput,
     fallback_header_date: Optional[str] = None,
 ) -> str:
-    ensure_emails_dir()
     # Determine timestamp
     dt = parse_date_to_utc(output.date) or parse_date_to_utc(fallback_header_date) or datetime.now(timezone.utc)
     ts = format_timestamp(dt)
-    path = pick_filename(ts, output.message_id)
+    return pick_filename(ts, output.message_id)
 
-    # Atomic write
-    tmp_path = path + ".tmp"
+
+def write_email_json(
+    output: EmailOutput,
+    fallback_header_date: Optional[str] = None,
+    path: Optional[str] = None,
+) -> str:
+    """
+    Writes the output as JSON. Pass a path from plan_email_path() to make the
+    write idempotent: rewriting the same path replaces the file instead of
+    creating a de-duplicated copy.
+    """
+    if path is None:
+        path = plan_email_path(output, fallback_header_date)
+    else:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    # Atomic write; the temp name is per process so concurrent writers never share it
+    tmp_path = f"{path}.{os.getpid()}.tmp"
     data = output.model_dump(by_alias=True)
     with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
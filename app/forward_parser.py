@@ -1,17 +1,47 @@
 from __future__ import annotations
 
 import re
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
 from email.message import EmailMessage
 from email import policy
 from email.parser import BytesParser
 
-INLINE_HEADER_RE = re.compile(r"^(From|To|Subject|Date|Message-Id):\s*(.*)$", re.IGNORECASE)
+INLINE_HEADER_RE = re.compile(r"^(From|To|Cc|Subject|Date|Sent|Message-Id):[ \t]*(.*?)\r?$", re.IGNORECASE)
 FORWARDED_MARKERS = [
     "---------- Forwarded message ---------",
     "Begin forwarded message:",
     "Forwarded message:",
 ]
+MARKER_PATTERN = "|".join(re.escape(m) for m in FORWARDED_MARKERS)
+MARKER_RE = re.compile(MARKER_PATTERN, re.IGNORECASE)
+# One sweep finds both forwarded markers (anywhere in a line) and header lines (at line start)
+SCAN_RE = re.compile(
+    r"(?P<marker>" + MARKER_PATTERN + r")|^(?P<header>From|To|Cc|Subject|Date|Sent|Message-Id):",
+    re.IGNORECASE | re.MULTILINE,
+)
+# A header block must start within this many lines after its marker
+MARKER_WINDOW = 19
+# Without any marker, only a header block near the top counts as a forward
+UNMARKED_WINDOW = 50
+
+
+class InlineForward(NamedTuple):
+    """One inline forwarded header block; offsets index into the scanned text."""
+
+    headers: Dict[str, str]
+    start: int  # marker line start, or header block start if there is no marker
+    block_start: int
+    block_end: int  # end of the header block, including the terminating blank line
+    body_end: int  # start of the next forward in the chain, or end of text
+
+
+class ForwardLevel(NamedTuple):
+    """One level of a forward chain, outermost first."""
+
+    method: str  # "rfc822" | "inline"
+    message: EmailMessage  # embedded message, or the message whose text holds the inline block
+    headers: Dict[str, str]  # inline headers; empty for rfc822 (use message headers)
+    body: Optional[str]  # forwarded text for inline levels; None for rfc822
 
 
 def find_rfc822_message(msg: EmailMessage) -> Optional[EmailMessage]:
@@ -32,96 +62,162 @@ def find_rfc822_message(msg: EmailMessage) -> Optional[EmailMessage]:
     return None
 
 
-def parse_inline_forwarded_headers(text: str) -> Tuple[Dict[str, str], Optional[Tuple[int, int]]]:
-    lines = text.splitlines()
-    start_idx = None
-    # Try to locate marker or first From:
-    for i, line in enumerate(lines):
-        if any(m.lower() in line.lower() for m in FORWARDED_MARKERS):
-            # Next non-empty line that looks like a header
-            for j in range(i + 1, min(i + 20, len(lines))):
-                if INLINE_HEADER_RE.match(lines[j]):
-                    start_idx = j
-                    break
-            if start_idx is not None:
-                break
-    if start_idx is None:
-        # Find first header-like line near top
-        for i, line in enumerate(lines[:50]):
-            if INLINE_HEADER_RE.match(line):
-                start_idx = i
-                break
-    if start_idx is None:
-        return {}, None
+def _next_line(text: str, pos: int) -> int:
+    nl = text.find("\n", pos)
+    return len(text) if nl < 0 else nl + 1
+
 
+def _parse_header_block(text: str, pos: int) -> Tuple[Dict[str, str], int]:
+    """
+    Reads header lines (with folded continuations) starting at pos. Returns the
+    headers and the offset just past the block, including a closing blank line.
+    """
     headers: Dict[str, str] = {}
-    idx = start_idx
-    while idx < len(lines):
-        line = lines[idx]
+    last_key: Optional[str] = None
+    n = len(text)
+    while pos < n:
+        end = _next_line(text, pos)
+        line = text[pos:end].rstrip("\r\n")
         if not line.strip():
             # blank line ends header block
-            end_idx = idx
-            return headers, (start_idx, end_idx)
+            return headers, end
         m = INLINE_HEADER_RE.match(line)
-        if not m:
-            # If folded header continuation (starts with space or tab)
-            if line.startswith(" ") or line.startswith("\t"):
-                # append to last header
-                if headers:
-                    last_key = list(headers.keys())[-1]
-                    headers[last_key] = headers[last_key] + " " + line.strip()
-                idx += 1
-                continue
-            else:
-                break
-        key = m.group(1).title()
-        value = m.group(2).strip()
-        headers[key] = value
-        idx += 1
+        if m:
+            last_key = m.group(1).title()
+            if last_key == "Sent":
+                # Outlook uses "Sent:" for the original date
+                last_key = "Date" if "Date" not in headers else last_key
+            headers[last_key] = m.group(2).strip()
+        elif line[0] in " \t" and last_key is not None:
+            # Folded header continuation
+            headers[last_key] = headers[last_key] + " " + line.strip()
+        else:
+            return headers, pos
+        pos = end
     # reached end without blank line
-    return headers, (start_idx, idx)
+    return headers, pos
+
+
+def parse_forward_chain(text: str, allow_unmarked: bool = True) -> List[InlineForward]:
+    """
+    Finds every inline forwarded header block in one pass over the text,
+    outermost first; the last entry is the original message. Blocks must follow
+    a forwarded marker, except that with allow_unmarked a header block near the
+    top is accepted when no marked block exists.
+    """
+    found: List[Tuple[Dict[str, str], int, int, int]] = []
+    unmarked: Optional[Tuple[Dict[str, str], int, int, int]] = None
+    marker_start: Optional[int] = None
+    marker_end = 0
+    pos = 0
+    unmarked_limit = 0
+    for _ in range(UNMARKED_WINDOW):
+        unmarked_limit = _next_line(text, unmarked_limit)
+    while True:
+        m = SCAN_RE.search(text, pos)
+        if m is None:
+            break
+        line_start = text.rfind("\n", 0, m.start()) + 1
+        if m.group("marker"):
+            marker_start = line_start
+            marker_end = _next_line(text, m.end())
+            pos = marker_end
+            continue
+        headers, block_end = _parse_header_block(text, line_start)
+        if marker_start is not None and text.count("\n", marker_end, line_start) < MARKER_WINDOW:
+            found.append((headers, marker_start, line_start, block_end))
+        elif allow_unmarked and unmarked is None and not found and line_start < unmarked_limit:
+            unmarked = (headers, line_start, line_start, block_end)
+        marker_start = None
+        pos = max(block_end, m.end())
+    if not found and unmarked is not None:
+        found.append(unmarked)
+
+    chain: List[InlineForward] = []
+    for i, (headers, start, block_start, block_end) in enumerate(found):
+        body_end = found[i + 1][1] if i + 1 < len(found) else len(text)
+        chain.append(InlineForward(headers, start, block_start, block_end, body_end))
+    return chain
+
+
+def parse_inline_forwarded_headers(text: str) -> Tuple[Dict[str, str], Optional[Tuple[int, int]]]:
+    """
+    Headers of the innermost inline forward and its (start, end) line range, as
+    expected by strip_header_block_from_text.
+    """
+    chain = parse_forward_chain(text)
+    if not chain:
+        return {}, None
+    fwd = chain[-1]
+    start_idx = text.count("\n", 0, fwd.block_start)
+    # End is the blank line that closed the block, or the last header line
+    end_idx = text.count("\n", 0, fwd.block_end) - 1
+    if fwd.block_end == len(text) and not text.endswith("\n"):
+        end_idx += 1
+    return fwd.headers, (start_idx, end_idx)
 
 
 def strip_header_block_from_text(text: str, block_range: Optional[Tuple[int, int]]) -> str:
     if not block_range:
         return text
     start, end = block_range
-    lines = text.splitlines()
+    lines = [line.rstrip("\r") for line in text.split("\n")]
     # Remove the header block and any preceding forwarded marker line
     remove_from = start
     # Remove marker line immediately before if present
-    if remove_from > 0 and any(
-        m.lower() in lines[remove_from - 1].lower() for m in FORWARDED_MARKERS
-    ):
+    if remove_from > 0 and MARKER_RE.search(lines[remove_from - 1]):
         remove_from = remove_from - 1
     new_lines = lines[:remove_from] + lines[end + 1 :]
     return "\n".join(new_lines).lstrip("\n")
 
 
-def get_original_message_and_headers(
-    msg: EmailMessage,
-) -> Tuple[EmailMessage, Dict[str, str], Optional[str], str]:
+def resolve_forward_chain(msg: EmailMessage) -> List[ForwardLevel]:
     """
-    Returns a tuple of:
-    - original EmailMessage (prioritizing embedded message/rfc822)
-    - parsed inline forwarded headers if any
-    - cleaned text body if inline headers were used (body with header block removed)
-    - method used: "rfc822" | "inline" | "top"
+    Unwraps nested forwards, outermost first: embedded message/rfc822 parts are
+    followed down to the innermost one, whose text is then scanned for inline
+    forwarded blocks. An empty list means the message is not a forward.
     """
-    # 1) Embedded message
-    inner = find_rfc822_message(msg)
-    if inner is not None:
-        return inner, {}, None, "rfc822"
+    return _resolve(msg)[0]
 
-    # 2) Inline forwarded header block
-    # Need a text to scan; try extracting from the outer message
+
+def _resolve(msg: EmailMessage) -> Tuple[List[ForwardLevel], str]:
+    """The forward chain plus the extracted text of the innermost message."""
     from .body_extractor import extract_text
 
-    outer_text = extract_text(msg)
-    headers, block_range = parse_inline_forwarded_headers(outer_text)
-    if headers:
-        cleaned = strip_header_block_from_text(outer_text, block_range)
-        return msg, headers, cleaned, "inline"
+    chain: List[ForwardLevel] = []
+    current = msg
+    while True:
+        inner = find_rfc822_message(current)
+        if inner is None or inner is current:
+            break
+        chain.append(ForwardLevel("rfc822", inner, {}, None))
+        current = inner
+
+    text = extract_text(current)
+    # Inside an embedded message only marked forwards count; a bare "To:" line is just body text
+    for fwd in parse_forward_chain(text, allow_unmarked=not chain):
+        body = text[fwd.block_end:fwd.body_end].strip("\r\n")
+        chain.append(ForwardLevel("inline", current, fwd.headers, body))
+    return chain, text
 
-    # 3) Fallback to top-level headers and attempt heuristics from body
-    return msg, {}, None, "top"
+
+def get_original_message_and_headers(
+    msg: EmailMessage,
+) -> Tuple[EmailMessage, Dict[str, str], str, str]:
+    """
+    Returns a tuple of:
+    - original EmailMessage (innermost embedded message/rfc822, else msg)
+    - parsed inline forwarded headers of the innermost forward, if any
+    - body text: that forward's body if inline headers were used, else the
+      text of the original message (already extracted, no need to call
+      extract_text again)
+    - method used for the innermost level: "rfc822" | "inline" | "top"
+    """
+    chain, text = _resolve(msg)
+    if not chain:
+        # Fallback to top-level headers
+        return msg, {}, text, "top"
+    original = chain[-1]
+    if original.method == "rfc822":
+        return original.message, {}, text, "rfc822"
+    return original.message, original.headers, original.body, "inline"
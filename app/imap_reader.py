@@ -2,11 +2,18 @@ from __future__ import annotations
 
 import imaplib
 import os
-from typing import Generator, Iterable, List, Optional, Tuple
+import re
+from typing import Dict, Generator, Iterable, List, Optional, Set, Tuple
 from email import policy
 from email.parser import BytesParser
 from email.message import EmailMessage
 
+FETCH_UID_RE = re.compile(rb"UID (\d+)")
+FETCH_FLAGS_RE = re.compile(rb"FLAGS \(([^)]*)\)")
+FETCH_MODSEQ_RE = re.compile(rb"MODSEQ \((\d+)\)")
+FETCH_SIZE_RE = re.compile(rb"RFC822\.SIZE (\d+)")
+HEADER_FETCH_BATCH = 200
+
 
 class IMAPReader:
     def __init__(
@@ -25,6 +32,8 @@ class IMAPReader:
         self.password = password
         self.folder = folder
         self.conn: Optional[imaplib.IMAP4] = None
+        self.uidvalidity: Optional[int] = None
+        self.capabilities: Set[str] = set()
 
     def connect(self) -> None:
         if self.ssl:
@@ -32,9 +41,18 @@ class IMAPReader:
         else:
             self.conn = imaplib.IMAP4(self.host, self.port)
         self.conn.login(self.username, self.password)
+        # imaplib only records the pre-login list; servers such as Dovecot and
+        # Gmail advertise extensions like CONDSTORE after authentication
+        typ, data = self.conn.capability()
+        if typ == "OK" and data and data[0]:
+            self.capabilities = set(data[0].decode("ascii", errors="replace").upper().split())
+        else:
+            self.capabilities = set(self.conn.capabilities)
         typ, data = self.conn.select(self.folder)
         if typ != "OK":
             raise RuntimeError(f"Failed to select folder {self.folder}: {typ} {data}")
+        _, validity = self.conn.response("UIDVALIDITY")
+        self.uidvalidity = int(validity[0]) if validity and validity[0] else None
 
     def close(self) -> None:
         if self.conn is not None:
@@ -86,9 +104,102 @@ class IMAPReader:
         msg = BytesParser(policy=policy.default).parsebytes(raw)
         return msg
 
+    def fetch_headers(self, uids: List[bytes]) -> Dict[bytes, Tuple[EmailMessage, Optional[int]]]:
+        """
+        Returns {uid: (headers, size)} using BODY.PEEK[HEADER], so message bodies
+        are never downloaded and \\Seen is not set. Fetched in batches of UIDs.
+        """
+        conn = self._conn_checked()
+        parser = BytesParser(policy=policy.default)
+        result: Dict[bytes, Tuple[EmailMessage, Optional[int]]] = {}
+        for i in range(0, len(uids), HEADER_FETCH_BATCH):
+            batch = uids[i:i + HEADER_FETCH_BATCH]
+            typ, data = conn.uid("FETCH", b",".join(batch), "(RFC822.SIZE BODY.PEEK[HEADER])")
+            if typ != "OK":
+                raise RuntimeError(f"UID FETCH HEADER failed: {typ} {data}")
+            data = data or []
+            for idx, part in enumerate(data):
+                if not isinstance(part, tuple):
+                    continue
+                # UID and size may come before the literal or in the trailer after it
+                trailer = data[idx + 1] if idx + 1 < len(data) and isinstance(data[idx + 1], bytes) else b""
+                meta = part[0] + b" " + trailer
+                m_uid = FETCH_UID_RE.search(meta)
+                if not m_uid:
+                    continue
+                m_size = FETCH_SIZE_RE.search(meta)
+                size = int(m_size.group(1)) if m_size else None
+                result[m_uid.group(1)] = (parser.parsebytes(part[1], headersonly=True), size)
+        return result
+
     def mark_seen(self, uid: bytes) -> None:
         conn = self._conn_checked()
-        conn.uid("STORE", uid, "+FLAGS", "(\\Seen)")
+        typ, data = conn.uid("STORE", uid, "+FLAGS", "(\\Seen)")
+        if typ != "OK":
+            # imaplib returns NO without raising; the caller must not record it as done
+            raise RuntimeError(f"UID STORE \\Seen failed for UID {uid!r}: {typ} {data}")
+
+    def has_capability(self, name: str) -> bool:
+        self._conn_checked()
+        return name.upper() in self.capabilities
+
+    def fetch_flags(self, uids: Iterable[bytes]) -> Dict[bytes, Tuple[Set[str], Optional[int]]]:
+        """
+        Returns {uid: (flags, modseq)} for the given UIDs. The modseq is None when
+        the server does not support CONDSTORE. UIDs that no longer exist are omitted.
+        """
+        conn = self._conn_checked()
+        uid_set = b",".join(uids)
+        if not uid_set:
+            return {}
+        items = "(FLAGS MODSEQ)" if self.has_capability("CONDSTORE") else "(FLAGS)"
+        typ, data = conn.uid("FETCH", uid_set, items)
+        if typ != "OK":
+            raise RuntimeError(f"UID FETCH FLAGS failed: {typ} {data}")
+        result: Dict[bytes, Tuple[Set[str], Optional[int]]] = {}
+        for part in data or []:
+            line = part[0] if isinstance(part, tuple) else part
+            if not line:
+                continue
+            m_uid = FETCH_UID_RE.search(line)
+            m_flags = FETCH_FLAGS_RE.search(line)
+            if not m_uid or not m_flags:
+                continue
+            flags = {f.decode("ascii", errors="replace") for f in m_flags.group(1).split()}
+            m_modseq = FETCH_MODSEQ_RE.search(line)
+            modseq = int(m_modseq.group(1)) if m_modseq else None
+            result[m_uid.group(1)] = (flags, modseq)
+        return result
+
+    def store_flags(
+        self,
+        uid: bytes,
+        op: str,
+        flags: Iterable[str],
+        unchanged_since: Optional[int] = None,
+    ) -> bool:
+        """
+        Runs UID STORE <op> for the given flags. When unchanged_since is set the
+        store is conditional (RFC 7162 CONDSTORE) and False is returned if the
+        server refused it because the message changed after that modseq.
+        """
+        conn = self._conn_checked()
+        flag_list = "(" + " ".join(flags) + ")"
+        if unchanged_since is None:
+            typ, data = conn.uid("STORE", uid, op, flag_list)
+            if typ != "OK":
+                raise RuntimeError(f"UID STORE {op} failed for UID {uid!r}: {typ} {data}")
+            return True
+        # Drop any stale MODIFIED response code left over from earlier commands
+        conn.response("MODIFIED")
+        typ, data = conn.uid("STORE", uid, f"(UNCHANGEDSINCE {unchanged_since})", op, flag_list)
+        if typ != "OK":
+            raise RuntimeError(f"Conditional UID STORE {op} failed for UID {uid!r}: {typ} {data}")
+        _, modified = conn.response("MODIFIED")
+        if modified and modified[0]:
+            # The response code lists the UIDs that were not updated
+            return False
+        return True
 
 
 def env_bool(name: str, default: bool = False) -> bool:
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import time
+from typing import List, NamedTuple, Optional
+
+from .models import EmailOutput
+
+JOURNAL_PATH = os.path.join(os.getcwd(), "progress.sqlite3")
+
+# Stages a message moves through; each is recorded only after it has happened
+STAGE_ANALYZED = "analyzed"  # LLM result stored, JSON file not yet written
+STAGE_WRITTEN = "written"  # JSON file written, \Seen not yet applied
+STAGE_DONE = "done"
+
+# Done rows only keep an unseen UID from being reprocessed; once it is \Seen
+# the search no longer returns it and the row can go
+DONE_RETENTION = 30 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    folder TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    uid TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    result TEXT,
+    fallback_date TEXT,
+    out_path TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (folder, uidvalidity, uid)
+)
+"""
+
+
+class JournalEntry(NamedTuple):
+    uidvalidity: int
+    uid: bytes
+    stage: str
+    result: Optional[EmailOutput]
+    fallback_date: Optional[str]
+    out_path: Optional[str]
+
+
+class ProgressJournal:
+    """
+    Write-ahead record of per-message progress, keyed by folder, UIDVALIDITY and
+    UID, so a killed run can finish half-committed messages without fetching or
+    calling OpenAI again. Stored in SQLite (WAL mode) so several processes on one
+    host can share the file.
+    """
+
+    def __init__(self, folder: str, path: Optional[str] = None) -> None:
+        self.folder = folder
+        self.path = path or JOURNAL_PATH
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.execute(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def get_stage(self, uidvalidity: int, uid: bytes) -> Optional[str]:
+        row = self.db.execute(
+            "SELECT stage FROM progress WHERE folder = ? AND uidvalidity = ? AND uid = ?",
+            (self.folder, uidvalidity, uid.decode()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def record_analyzed(
+        self,
+        uidvalidity: int,
+        uid: bytes,
+        result: EmailOutput,
+        fallback_date: Optional[str],
+        out_path: str,
+    ) -> None:
+        self.db.execute(
+            "INSERT OR REPLACE INTO progress "
+            "(folder, uidvalidity, uid, stage, result, fallback_date, out_path, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self.folder,
+                uidvalidity,
+                uid.decode(),
+                STAGE_ANALYZED,
+                result.model_dump_json(by_alias=True),
+                fallback_date,
+                out_path,
+                time.time(),
+            ),
+        )
+
+    def set_stage(self, uidvalidity: int, uid: bytes, stage: str) -> None:
+        if stage == STAGE_DONE:
+            # Only the key and stage are needed to skip the UID from here on
+            self.db.execute(
+                "UPDATE progress SET stage = ?, result = NULL, fallback_date = NULL, out_path = NULL, "
+                "updated_at = ? WHERE folder = ? AND uidvalidity = ? AND uid = ?",
+                (stage, time.time(), self.folder, uidvalidity, uid.decode()),
+            )
+            return
+        self.db.execute(
+            "UPDATE progress SET stage = ?, updated_at = ? "
+            "WHERE folder = ? AND uidvalidity = ? AND uid = ?",
+            (stage, time.time(), self.folder, uidvalidity, uid.decode()),
+        )
+
+    def prune_done(self, older_than: float = DONE_RETENTION) -> int:
+        """Deletes this folder's done entries last updated more than older_than seconds ago."""
+        cur = self.db.execute(
+            "DELETE FROM progress WHERE folder = ? AND stage = ? AND updated_at < ?",
+            (self.folder, STAGE_DONE, time.time() - older_than),
+        )
+        return cur.rowcount
+
+    def pending(self) -> List[JournalEntry]:
+        """Entries for this folder that have not reached STAGE_DONE, oldest first."""
+        rows = self.db.execute(
+            "SELECT uidvalidity, uid, stage, result, fallback_date, out_path FROM progress "
+            "WHERE folder = ? AND stage != ? ORDER BY updated_at",
+            (self.folder, STAGE_DONE),
+        ).fetchall()
+        entries = []
+        for uidvalidity, uid, stage, result, fallback_date, out_path in rows:
+            output = EmailOutput.model_validate_json(result) if result else None
+            entries.append(JournalEntry(uidvalidity, uid.encode(), stage, output, fallback_date, out_path))
+        return entries
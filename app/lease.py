@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import re
+import time
+from typing import List, NamedTuple, Optional, Set
+
+from .imap_reader import IMAPReader
+
+LEASE_PREFIX = "$Processing-"
+WORKER_ID_RE = re.compile(r"[^A-Za-z0-9._-]+")
+DEFAULT_LEASE_TTL = 600
+
+
+class Lease(NamedTuple):
+    uid: bytes
+    keyword: str
+    worker_id: str
+    expires: int
+
+
+def sanitize_worker_id(worker_id: str) -> str:
+    # IMAP keywords are atoms: no spaces, parens, quotes, wildcards or backslashes
+    wid = WORKER_ID_RE.sub("", worker_id.strip())
+    if not wid:
+        raise ValueError(f"Invalid worker id: {worker_id!r}")
+    return wid
+
+
+def make_lease_keyword(worker_id: str, expires: int) -> str:
+    return f"{LEASE_PREFIX}{worker_id}-{expires}"
+
+
+def parse_lease_keyword(uid: bytes, keyword: str) -> Optional[Lease]:
+    if not keyword.startswith(LEASE_PREFIX):
+        return None
+    rest = keyword[len(LEASE_PREFIX):]
+    worker_id, sep, expires = rest.rpartition("-")
+    if not sep or not worker_id or not expires.isdigit():
+        return None
+    return Lease(uid, keyword, worker_id, int(expires))
+
+
+def leases_from_flags(uid: bytes, flags: Set[str]) -> List[Lease]:
+    leases = []
+    for flag in flags:
+        lease = parse_lease_keyword(uid, flag)
+        if lease is not None:
+            leases.append(lease)
+    return leases
+
+
+class LeaseManager:
+    """
+    Claims messages for a single worker by tagging them with a
+    `$Processing-<worker>-<expiry>` keyword, so several workers can share one
+    mailbox without processing the same UID twice.
+
+    With CONDSTORE the claim is a compare-and-set (UID STORE UNCHANGEDSINCE).
+    Without it the claim is store-then-verify and backs off whenever a
+    competing live lease is seen. Expiry is a Unix timestamp, so worker clocks
+    must be roughly in sync; leases past their expiry are reclaimed.
+    """
+
+    def __init__(self, reader: IMAPReader, worker_id: str, ttl: int = DEFAULT_LEASE_TTL) -> None:
+        self.reader = reader
+        self.worker_id = sanitize_worker_id(worker_id)
+        self.ttl = ttl
+
+    def _live_foreign_leases(self, leases: List[Lease], now: float) -> List[Lease]:
+        return [l for l in leases if l.expires > now and l.worker_id != self.worker_id]
+
+    def claim(self, uid: bytes) -> Optional[Lease]:
+        """Returns the lease if this worker now owns the message, else None."""
+        state = self.reader.fetch_flags([uid]).get(uid)
+        if state is None:
+            return None
+        flags, modseq = state
+        if "\\Seen" in flags:
+            # Another worker finished it after our search
+            return None
+        now = time.time()
+        existing = leases_from_flags(uid, flags)
+        if self._live_foreign_leases(existing, now):
+            return None
+
+        expires = int(now) + self.ttl
+        lease = Lease(uid, make_lease_keyword(self.worker_id, expires), self.worker_id, expires)
+        if modseq is not None:
+            if not self.reader.store_flags(uid, "+FLAGS", [lease.keyword], unchanged_since=modseq):
+                return None
+        else:
+            self.reader.store_flags(uid, "+FLAGS", [lease.keyword])
+            state = self.reader.fetch_flags([uid]).get(uid)
+            current = leases_from_flags(uid, state[0]) if state else []
+            if state is None or self._live_foreign_leases(current, time.time()):
+                self.release(lease)
+                return None
+
+        # Reclaim: drop expired leases and our own leftovers from a previous run
+        stale = [l.keyword for l in existing if l.keyword != lease.keyword]
+        if stale:
+            self.reader.store_flags(uid, "-FLAGS", stale)
+        return lease
+
+    def renew(self, lease: Lease) -> Optional[Lease]:
+        """
+        Swaps the keyword for one with a fresh expiry. Returns None if the lease
+        was lost (expired and reclaimed by another worker, or the message is gone).
+        """
+        state = self.reader.fetch_flags([lease.uid]).get(lease.uid)
+        if state is None:
+            return None
+        flags, modseq = state
+        if lease.keyword not in flags or self._live_foreign_leases(leases_from_flags(lease.uid, flags), time.time()):
+            return None
+        expires = int(time.time()) + self.ttl
+        renewed = Lease(lease.uid, make_lease_keyword(self.worker_id, expires), self.worker_id, expires)
+        if renewed.keyword == lease.keyword:
+            return lease
+        if not self.reader.store_flags(lease.uid, "+FLAGS", [renewed.keyword], unchanged_since=modseq):
+            return None
+        self.reader.store_flags(lease.uid, "-FLAGS", [lease.keyword])
+        return renewed
+
+    def release(self, lease: Lease) -> None:
+        self.reader.store_flags(lease.uid, "-FLAGS", [lease.keyword])
@@ -2,24 +2,60 @@ from __future__ import annotations
 
 import json
 import os
-from typing import Dict
+from typing import Dict, Optional
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from openai import OpenAI
 from .models import EmailOutput
 
+ANALYZE_ATTEMPTS = 3
+RETRY_WAIT_MAX = 8
+# Retries the SDK makes inside each attempt when no deadline is set
+SDK_MAX_RETRIES = 2
+# Shortest per-request timeout worth sending; below this most real calls fail
+MIN_REQUEST_TIMEOUT = 10.0
+
+
+def analyze_time_bound(timeout: float) -> float:
+    """Worst-case duration of analyze() on a processor built with this request timeout."""
+    return ANALYZE_ATTEMPTS * timeout + (ANALYZE_ATTEMPTS - 1) * RETRY_WAIT_MAX
+
+
+MIN_ANALYZE_BUDGET = analyze_time_bound(MIN_REQUEST_TIMEOUT)
+
+
+def request_timeout_within(budget: float) -> float:
+    """
+    Per-request timeout that keeps a fully retried analyze() call within budget
+    seconds. Raises ValueError if that would be below MIN_REQUEST_TIMEOUT.
+    """
+    timeout = (budget - (ANALYZE_ATTEMPTS - 1) * RETRY_WAIT_MAX) / ANALYZE_ATTEMPTS
+    if timeout < MIN_REQUEST_TIMEOUT:
+        raise ValueError(f"{budget:.0f}s is too short for a retried OpenAI call; need at least {MIN_ANALYZE_BUDGET:.0f}s")
+    return timeout
+
 
 class OpenAIEmailProcessor:
-    def __init__(self, api_key: str | None = None, model: str = "gpt-4o-mini") -> None:
+    def __init__(
+        self,
+        api_key: str | None = None,
+        model: str = "gpt-4o-mini",
+        timeout: Optional[float] = None,
+    ) -> None:
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise RuntimeError("OPENAI_API_KEY is not set")
         self.model = os.getenv("OPENAI_MODEL", model)
-        self.client = OpenAI(api_key=self.api_key)
+        if timeout is not None:
+            # With a deadline only tenacity retries: the SDK would honour Retry-After
+            # waits of up to a minute, which analyze_time_bound() cannot account for
+            self.client = OpenAI(api_key=self.api_key, max_retries=0, timeout=timeout)
+        else:
+            self.client = OpenAI(api_key=self.api_key, max_retries=SDK_MAX_RETRIES)
 
     @retry(
         retry=retry_if_exception_type(Exception),
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=1, max=8),
+        stop=stop_after_attempt(ANALYZE_ATTEMPTS),
+        wait=wait_exponential(multiplier=1, min=1, max=RETRY_WAIT_MAX),
         reraise=True,
     )
     def analyze(self, headers: Dict[str, str], body_text: str) -> EmailOutput:
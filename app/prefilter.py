@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import json
+import re
+from collections import Counter
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional
+
+ROUTE_SKIP = "skip"  # never fetch the body
+ROUTE_LOCAL = "local"  # fetch and extract, but build the output without OpenAI
+ROUTE_LLM = "llm"  # full processing
+ROUTES = {ROUTE_SKIP, ROUTE_LOCAL, ROUTE_LLM}
+
+# Used when no rules file is configured. First matching rule wins.
+DEFAULT_RULES: List[Dict[str, Any]] = [
+    # RFC 3834: anything other than "no" is machine-generated
+    {"name": "auto-submitted", "action": ROUTE_SKIP, "header": "Auto-Submitted", "pattern": r"^\s*auto-"},
+    {"name": "precedence-bulk", "action": ROUTE_SKIP, "header": "Precedence", "pattern": r"^\s*(bulk|list|junk)\b"},
+    {"name": "auto-response-suppress", "action": ROUTE_SKIP, "header": "X-Auto-Response-Suppress"},
+    {"name": "list-unsubscribe", "action": ROUTE_SKIP, "header": "List-Unsubscribe"},
+    {"name": "bounce-sender", "action": ROUTE_SKIP, "from": r"\b(mailer-daemon|postmaster)@"},
+    {"name": "noreply-sender", "action": ROUTE_SKIP, "from": r"\bno-?reply@"},
+    # The OpenAI prompt only sees the first 8000 characters anyway
+    {"name": "oversized", "action": ROUTE_LOCAL, "min_size": 25 * 1024 * 1024},
+]
+
+
+class PrefilterRule:
+    """
+    One rule from the rules file: a name, an action (required) and conditions.
+    All conditions that are set must match:
+    - header: header name; without pattern, matches when the header is present
+    - pattern: regex searched (case-insensitive) in that header's value
+    - from: regex searched (case-insensitive) in the From header
+    - min_size / max_size: bounds on RFC822.SIZE in bytes
+    """
+
+    def __init__(self, spec: Dict[str, Any]) -> None:
+        self.name = str(spec.get("name") or "")
+        self.action = spec.get("action")
+        if not self.name:
+            raise ValueError(f"Pre-filter rule is missing a name: {spec!r}")
+        if self.action is None:
+            # No default: a rule that silently skipped mail would mark it seen unprocessed
+            raise ValueError(f"Pre-filter rule {self.name!r} is missing an action")
+        if self.action not in ROUTES:
+            raise ValueError(f"Pre-filter rule {self.name!r} has unknown action {self.action!r}")
+        # Checked here so a bad rules file fails at startup rather than mid-run
+        for key in ("header", "pattern", "from"):
+            if spec.get(key) is not None and not isinstance(spec[key], str):
+                raise ValueError(f"Pre-filter rule {self.name!r}: {key} must be a string, got {spec[key]!r}")
+        for key in ("min_size", "max_size"):
+            value = spec.get(key)
+            if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+                raise ValueError(f"Pre-filter rule {self.name!r}: {key} must be an integer byte count, got {value!r}")
+        self.header: Optional[str] = spec.get("header")
+        self.pattern = re.compile(spec["pattern"], re.IGNORECASE) if spec.get("pattern") else None
+        self.from_pattern = re.compile(spec["from"], re.IGNORECASE) if spec.get("from") else None
+        self.min_size: Optional[int] = spec.get("min_size")
+        self.max_size: Optional[int] = spec.get("max_size")
+        if self.pattern is not None and not self.header:
+            raise ValueError(f"Pre-filter rule {self.name!r} has a pattern but no header")
+        if not (self.header or self.from_pattern or self.min_size is not None or self.max_size is not None):
+            raise ValueError(f"Pre-filter rule {self.name!r} has no conditions")
+
+    def matches(self, headers: EmailMessage, size: Optional[int]) -> bool:
+        try:
+            return self._matches(headers, size)
+        except Exception:
+            # The email package raises on some malformed address headers
+            # (e.g. "a <b@[127.0.0.1>"); a header we cannot read matches nothing
+            return False
+
+    def _matches(self, headers: EmailMessage, size: Optional[int]) -> bool:
+        if self.header:
+            value = headers.get(self.header)
+            if value is None:
+                return False
+            if self.pattern is not None and not self.pattern.search(str(value)):
+                return False
+        if self.from_pattern is not None:
+            sender = headers.get("From")
+            if sender is None or not self.from_pattern.search(str(sender)):
+                return False
+        if self.min_size is not None and (size is None or size < self.min_size):
+            return False
+        if self.max_size is not None and (size is None or size > self.max_size):
+            return False
+        return True
+
+
+class Prefilter:
+    """Routes messages to skip / local / llm from headers alone, counting rule hits."""
+
+    def __init__(self, rules: List[Dict[str, Any]], default: str = ROUTE_LLM) -> None:
+        if default not in ROUTES:
+            raise ValueError(f"Unknown default pre-filter action {default!r}")
+        self.rules = [PrefilterRule(r) for r in rules]
+        self.default = default
+        self.counts: Counter = Counter()
+
+    @classmethod
+    def from_file(cls, path: str) -> "Prefilter":
+        """
+        Loads a JSON rules file:
+        {"default": "llm", "rules": [{"name": "...", "action": "skip", "header": "Precedence", "pattern": "bulk"}]}
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(config.get("rules", []), default=config.get("default", ROUTE_LLM))
+
+    def route(self, headers: Optional[EmailMessage], size: Optional[int] = None) -> str:
+        if headers is None:
+            # Header fetch failed or UID vanished; let the full path decide
+            self.counts["(default)"] += 1
+            return self.default
+        for rule in self.rules:
+            if rule.matches(headers, size):
+                self.counts[rule.name] += 1
+                return rule.action
+        self.counts["(default)"] += 1
+        return self.default
+
+    def summary(self) -> List[str]:
+        actions = {r.name: r.action for r in self.rules}
+        actions["(default)"] = self.default
+        return [f"{name}: {count} ({actions[name]})" for name, count in self.counts.most_common()]
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.getcwd(), "bench_results")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile; None for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def latency_stats(seconds: List[float]) -> Dict[str, Optional[float]]:
+    ms = [s * 1000.0 for s in seconds]
+    return {
+        "count": len(ms),
+        "mean_ms": sum(ms) / len(ms) if ms else None,
+        "p50_ms": percentile(ms, 50),
+        "p99_ms": percentile(ms, 99),
+        "max_ms": max(ms) if ms else None,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, timeout=10
+        )
+    except Exception:
+        return None
+    return out.stdout.strip() or None
+
+
+def write_results(suite: str, params: Dict[str, Any], results: Dict[str, Any], out_dir: Optional[str] = None) -> str:
+    """
+    Writes one run as JSON under bench_results/ (or out_dir) with enough
+    metadata to compare it against later runs. Returns the file path.
+    """
+    now = datetime.now(timezone.utc)
+    out_dir = out_dir or RESULTS_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    data = {
+        "suite": suite,
+        "timestamp": now.isoformat(),
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": params,
+        "results": results,
+    }
+    path = os.path.join(out_dir, f"{now.strftime('%Y%m%dT%H%M%SZ')}_{suite}.json")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return path
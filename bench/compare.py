@@ -0,0 +1,51 @@
+"""
+Compares two benchmark result files.
+
+    python -m bench.compare bench_results/OLD_load.json bench_results/NEW_load.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from typing import Any, Dict, Optional, Sequence
+
+
+def flatten(data: Any, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves keyed by dotted path; booleans and strings are skipped."""
+    out: Dict[str, float] = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            out.update(flatten(value, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        out[prefix] = float(data)
+    return out
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.4g}"
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    args = parser.parse_args(argv)
+    with open(args.old, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(args.new, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    if old.get("suite") != new.get("suite"):
+        parser.error(f"suites differ: {old.get('suite')} vs {new.get('suite')}")
+    if old.get("params") != new.get("params"):
+        print("warning: parameters differ between runs")
+    print(f"{'metric':60s} {'old':>12s} {'new':>12s} {'change':>8s}")
+    old_flat = flatten(old.get("results", {}))
+    new_flat = flatten(new.get("results", {}))
+    for key in sorted(set(old_flat) | set(new_flat)):
+        a, b = old_flat.get(key), new_flat.get(key)
+        change = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else ""
+        print(f"{key:60s} {_fmt(a):>12s} {_fmt(b):>12s} {change:>8s}")
+
+
+if __name__ == "__main__":
+    main()
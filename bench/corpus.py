@@ -0,0 +1,200 @@
+"""
+Deterministic synthetic mail corpus for benchmarks and load tests.
+
+The same (count, seed, kinds) always yields byte-identical messages, so runs on
+different commits process the same input.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from email import policy
+from email.message import EmailMessage
+from email.utils import format_datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+KINDS = ["plain", "forwarded", "nested", "html", "attachment", "non_utf8", "bulk"]
+BASE_DATE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+WORDS = (
+    "budget quarterly invoice meeting agenda review contract deadline proposal "
+    "customer shipment update report forecast revenue travel approval schedule"
+).split()
+NON_UTF8 = [
+    ("iso-8859-1", "Grüße aus Köln, die Rechnung für März ist fällig."),
+    ("koi8-r", "Привет, отчёт за квартал во вложении."),
+    ("shift_jis", "会議の議事録を送ります。ご確認ください。"),
+]
+
+
+class _Gen:
+    def __init__(self, rng: random.Random, index: int, attachment_size: int) -> None:
+        self.rng = rng
+        self.index = index
+        self.attachment_size = attachment_size
+
+    def person(self) -> Tuple[str, str]:
+        n = self.rng.randrange(10000)
+        return f"Person {n}", f"person{n}@example.com"
+
+    def addr(self) -> str:
+        name, email = self.person()
+        return f"{name} <{email}>"
+
+    def date(self, back: int = 0) -> datetime:
+        return BASE_DATE + timedelta(minutes=self.index * 7 - back * 90)
+
+    def text(self, lines: int) -> str:
+        return "\n".join(
+            " ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(6, 14))).capitalize() + "."
+            for _ in range(lines)
+        )
+
+    def base(self, subject: str, back: int = 0) -> EmailMessage:
+        msg = EmailMessage()
+        msg["From"] = self.addr()
+        msg["To"] = self.addr()
+        msg["Subject"] = subject
+        msg["Date"] = format_datetime(self.date(back))
+        msg["Message-Id"] = f"<bench-{self.index}-{back}@example.com>"
+        return msg
+
+    def inline_block(self, back: int, subject: str) -> str:
+        return "\n".join([
+            "---------- Forwarded message ---------",
+            f"From: {self.addr()}",
+            f"Date: {format_datetime(self.date(back))}",
+            f"Subject: {subject}",
+            f"To: {self.addr()}",
+            "",
+            "",
+        ])
+
+
+def _plain(g: _Gen) -> EmailMessage:
+    msg = g.base("Weekly " + g.rng.choice(WORDS))
+    msg.set_content(g.text(g.rng.randint(5, 40)))
+    return msg
+
+
+def _forwarded(g: _Gen) -> EmailMessage:
+    # Inline "Fwd: Fwd: ..." chain, 1-3 levels deep
+    depth = g.rng.randint(1, 3)
+    subject = "Original " + g.rng.choice(WORDS)
+    parts = ["FYI, see below.", ""]
+    for level in range(depth, 0, -1):
+        # Outermost forward is the most recent; the original is the oldest
+        parts.append(g.inline_block(depth - level + 1, "Fwd: " * (level - 1) + subject))
+        parts.append(g.text(2) if level > 1 else g.text(g.rng.randint(5, 30)))
+        parts.append("")
+    msg = g.base("Fwd: " * depth + subject)
+    msg.set_content("\n".join(parts))
+    return msg
+
+
+def _nested(g: _Gen) -> EmailMessage:
+    # Forward as attachment, wrapped 1-3 times
+    depth = g.rng.randint(1, 3)
+    inner = g.base("Original " + g.rng.choice(WORDS), back=depth)
+    inner.set_content(g.text(g.rng.randint(5, 30)))
+    for level in range(depth - 1, -1, -1):
+        outer = g.base("Fwd: " + str(inner["Subject"]), back=level)
+        outer.set_content("Forwarding as attachment.")
+        outer.add_attachment(inner)
+        inner = outer
+    return inner
+
+
+def _html(g: _Gen) -> EmailMessage:
+    msg = g.base("Newsletter draft " + g.rng.choice(WORDS))
+    rows = "".join(f"<tr><td>{g.rng.choice(WORDS)}</td><td>{g.rng.randint(1, 9999)}</td></tr>" for _ in range(40))
+    paragraphs = "".join(f"<p>{line}</p>" for line in g.text(g.rng.randint(5, 40)).split("\n"))
+    html = f"<html><body><h1>Report</h1>{paragraphs}<table>{rows}</table></body></html>"
+    msg.set_content(html, subtype="html")
+    return msg
+
+
+def _attachment(g: _Gen) -> EmailMessage:
+    msg = g.base("Files: " + g.rng.choice(WORDS))
+    msg.set_content(g.text(5))
+    data = g.rng.getrandbits(8 * g.attachment_size).to_bytes(g.attachment_size, "little")
+    msg.add_attachment(data, maintype="application", subtype="octet-stream", filename="data.bin")
+    return msg
+
+
+def _non_utf8(g: _Gen) -> EmailMessage:
+    charset, sample = g.rng.choice(NON_UTF8)
+    msg = g.base("Charset " + charset)
+    cte = "8bit" if charset == "iso-8859-1" else "base64"
+    msg.set_content("\n".join([sample] * g.rng.randint(3, 20)), charset=charset, cte=cte)
+    return msg
+
+
+def _bulk(g: _Gen) -> EmailMessage:
+    msg = g.base("Your weekly digest")
+    msg["List-Unsubscribe"] = "<mailto:unsubscribe@lists.example.com>"
+    msg["Precedence"] = "bulk"
+    msg.set_content(g.text(g.rng.randint(10, 40)))
+    return msg
+
+
+BUILDERS: Dict[str, Callable[[_Gen], EmailMessage]] = {
+    "plain": _plain,
+    "forwarded": _forwarded,
+    "nested": _nested,
+    "html": _html,
+    "attachment": _attachment,
+    "non_utf8": _non_utf8,
+    "bulk": _bulk,
+}
+
+
+def _freeze_boundaries(msg: EmailMessage, index: int) -> None:
+    # Generated boundaries are random; fix them so output is byte-identical
+    for n, part in enumerate(msg.walk()):
+        if part.is_multipart() and part.get_content_maintype() == "multipart":
+            part.set_boundary(f"bench-{index}-{n}")
+
+
+def generate_message(index: int, kind: str, seed: int = 0, attachment_size: int = 1024 * 1024) -> bytes:
+    if kind not in BUILDERS:
+        raise ValueError(f"Unknown corpus kind {kind!r}; expected one of {', '.join(KINDS)}")
+    rng = random.Random(f"{seed}:{index}:{kind}")
+    msg = BUILDERS[kind](_Gen(rng, index, attachment_size))
+    _freeze_boundaries(msg, index)
+    return msg.as_bytes(policy=policy.SMTP)
+
+
+def generate_corpus(
+    count: int,
+    seed: int = 0,
+    kinds: Optional[Sequence[str]] = None,
+    attachment_size: int = 1024 * 1024,
+) -> List[Tuple[str, bytes]]:
+    """Returns [(kind, raw_bytes)], cycling through kinds in order."""
+    kinds = list(kinds or KINDS)
+    return [
+        (kinds[i % len(kinds)], generate_message(i, kinds[i % len(kinds)], seed, attachment_size))
+        for i in range(count)
+    ]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Write a synthetic corpus as .eml files")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kinds", default=",".join(KINDS), help="Comma-separated subset of: " + ", ".join(KINDS))
+    parser.add_argument("--attachment-size", type=int, default=1024 * 1024)
+    parser.add_argument("--out", default="bench_corpus")
+    args = parser.parse_args(argv)
+    os.makedirs(args.out, exist_ok=True)
+    corpus = generate_corpus(args.count, args.seed, args.kinds.split(","), args.attachment_size)
+    for i, (kind, raw) in enumerate(corpus):
+        with open(os.path.join(args.out, f"{i:06d}_{kind}.eml"), "wb") as f:
+            f.write(raw)
+    print(f"Wrote {len(corpus)} message(s) to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
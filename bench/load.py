@@ -0,0 +1,221 @@
+"""
+End-to-end load test of `cli.run` against the fake IMAP and OpenAI servers.
+
+    python -m bench.load --messages 500 --workers 4 --latency 0.2 --rate-429 0.02
+
+Each worker is a separate `python -m app.cli run` process (with --worker-id
+when there is more than one), so the numbers include process startup, IMAP
+round trips and the OpenAI SDK. Per-message latency is the elapsed time each
+"Processed UID" line reports, from picking up the UID (pre-filter, claim,
+fetch, analyze, write) to the file being written. Results are written as JSON
+under bench_results/.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+from tests.fake_imap import FakeIMAPServer
+from tests.fake_openai import FakeOpenAIServer
+
+from .common import REPO_ROOT, latency_stats, write_results
+from .corpus import KINDS, generate_corpus
+
+# "Processed UID 12: emails/....json (0.123s)"
+PROCESSED_RE = re.compile(r"^Processed UID (\S+): .* \((\d+(?:\.\d+)?)s\)$")
+
+
+class _WorkerOutput:
+    def __init__(self, proc: subprocess.Popen) -> None:
+        self.proc = proc
+        self.started: Optional[float] = None
+        self.completions: List[float] = []
+        self.uids: List[str] = []
+        self.elapsed: List[float] = []
+        self.errors: List[str] = []
+        self._threads = [
+            threading.Thread(target=self._read_stdout, daemon=True),
+            threading.Thread(target=self._read_stderr, daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _read_stdout(self) -> None:
+        for line in self.proc.stdout:
+            now = time.perf_counter()
+            if line.startswith("Found ") and self.started is None:
+                self.started = now
+            else:
+                m = PROCESSED_RE.match(line.rstrip("\n"))
+                if m:
+                    self.completions.append(now)
+                    self.uids.append(m.group(1))
+                    self.elapsed.append(float(m.group(2)))
+
+    def _read_stderr(self) -> None:
+        for line in self.proc.stderr:
+            self.errors.append(line.rstrip("\n"))
+
+    def join(self) -> None:
+        for t in self._threads:
+            t.join()
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_load(
+    messages: int,
+    workers: int,
+    latency: float,
+    jitter: float,
+    rate_429: float,
+    seed: int,
+    kinds: Sequence[str],
+    attachment_size: int,
+    prefilter: bool,
+    timeout: float,
+) -> Dict[str, object]:
+    corpus = generate_corpus(messages, seed, kinds, attachment_size)
+    with FakeIMAPServer() as imap, FakeOpenAIServer(latency, jitter, rate_429, seed=seed) as llm:
+        for _, raw in corpus:
+            imap.mailbox.add(raw)
+        with tempfile.TemporaryDirectory() as workdir:
+            env = dict(os.environ)
+            env.update({
+                "IMAP_HOST": "127.0.0.1",
+                "IMAP_PORT": str(imap.port),
+                "IMAP_SSL": "false",
+                "IMAP_USERNAME": "bench",
+                "IMAP_PASSWORD": "bench",
+                "IMAP_FOLDER": "INBOX",
+                "OPENAI_API_KEY": "bench-key",
+                "OPENAI_BASE_URL": llm.base_url,
+                "MARK_SEEN": "true",
+                "PREFILTER": "true" if prefilter else "false",
+                "PREFILTER_RULES": "",
+                "JOURNAL_PATH": os.path.join(workdir, "progress.sqlite3"),
+                # Blank out settings a stray .env could otherwise supply
+                "LIMIT": "",
+                "WORKER_ID": "",
+                "PYTHONPATH": os.pathsep.join(p for p in [REPO_ROOT, os.environ.get("PYTHONPATH")] if p),
+            })
+            start = time.perf_counter()
+            outputs = []
+            for i in range(workers):
+                cmd = [sys.executable, "-m", "app.cli", "run"]
+                if workers > 1:
+                    cmd += ["--worker-id", f"bench-{i}"]
+                proc = subprocess.Popen(
+                    cmd, cwd=workdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+                )
+                outputs.append(_WorkerOutput(proc))
+            timed_out = False
+            for out in outputs:
+                try:
+                    out.proc.wait(timeout=max(0.0, timeout - (time.perf_counter() - start)))
+                except subprocess.TimeoutExpired:
+                    timed_out = True
+                    out.proc.kill()
+                    out.proc.wait()
+                out.join()
+            wall = time.perf_counter() - start
+            peak_rss = _peak_rss_mb()
+
+            emails_dir = os.path.join(workdir, "emails")
+            written = len(os.listdir(emails_dir)) if os.path.isdir(emails_dir) else 0
+            seen = sum(1 for uid in imap.mailbox.uids if "\\Seen" in imap.mailbox.flags(uid))
+
+    uids = [uid for out in outputs for uid in out.uids]
+    latencies = [lat for out in outputs for lat in out.elapsed]
+    starts = [out.started for out in outputs if out.started is not None]
+    ends = [out.completions[-1] for out in outputs if out.completions]
+    window = (max(ends) - min(starts)) if starts and ends else None
+    stderr = [line for out in outputs for line in out.errors]
+    errors = [line for line in stderr if line.startswith("Error")]
+    return {
+        "processed": len(uids),
+        "duplicates": len(uids) - len(set(uids)),
+        "written_files": written,
+        "seen": seen,
+        "errors": len(errors),
+        "stderr_samples": stderr[:10],
+        "exit_codes": [out.proc.returncode for out in outputs],
+        "timed_out": timed_out,
+        "wall_s": wall,
+        "messages_per_sec": len(uids) / wall if wall else None,
+        "messages_per_sec_processing": len(uids) / window if window else None,
+        "latency": latency_stats(latencies),
+        "peak_rss_mb": peak_rss,
+        "openai_requests": llm.requests,
+        "openai_rate_limited": llm.rate_limited,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="End-to-end cli.run load test")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake OpenAI latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra uniform random latency in seconds")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of OpenAI requests answered with 429")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kinds", default=",".join(KINDS))
+    parser.add_argument("--attachment-size", type=int, default=256 * 1024)
+    parser.add_argument("--no-prefilter", action="store_true")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--out", default=None, help="Results directory (default bench_results/)")
+    args = parser.parse_args(argv)
+
+    params = {
+        "messages": args.messages,
+        "workers": args.workers,
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "rate_429": args.rate_429,
+        "seed": args.seed,
+        "kinds": args.kinds.split(","),
+        "attachment_size": args.attachment_size,
+        "prefilter": not args.no_prefilter,
+    }
+    results = run_load(
+        args.messages,
+        args.workers,
+        args.latency,
+        args.jitter,
+        args.rate_429,
+        args.seed,
+        args.kinds.split(","),
+        args.attachment_size,
+        not args.no_prefilter,
+        args.timeout,
+    )
+    path = write_results("load", params, results, args.out)
+    lat = results["latency"]
+    print(
+        f"{results['processed']} processed ({results['duplicates']} duplicate, {results['errors']} errors) "
+        f"in {results['wall_s']:.2f}s: {results['messages_per_sec'] or 0:.1f} msg/s, "
+        f"p50 {lat['p50_ms'] or 0:.1f} ms, p99 {lat['p99_ms'] or 0:.1f} ms, peak RSS {results['peak_rss_mb'] or 0:.1f} MB"
+    )
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
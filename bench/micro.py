@@ -0,0 +1,130 @@
+"""
+Per-stage microbenchmarks over the synthetic corpus.
+
+    python -m bench.micro --count 200 --repeat 3
+
+Each stage is timed per message in isolation, with its inputs prepared
+outside the timed region. Results are written as JSON under bench_results/.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from collections import defaultdict
+from email import policy
+from email.message import EmailMessage
+from email.parser import BytesParser
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.body_extractor import extract_text
+from app.file_store import write_email_json
+from app.forward_parser import get_original_message_and_headers, resolve_forward_chain
+from app.journal import ProgressJournal
+from app.models import EmailOutput
+from app.prefilter import DEFAULT_RULES, Prefilter
+
+from .common import latency_stats, write_results
+from .corpus import KINDS, generate_corpus
+
+
+def _header_bytes(raw: bytes) -> bytes:
+    end = raw.find(b"\r\n\r\n")
+    return raw if end < 0 else raw[: end + 4]
+
+
+def _time_stage(
+    inputs: List[Tuple[str, object]],
+    fn: Callable[[object], object],
+    repeat: int,
+) -> Dict[str, object]:
+    samples: List[float] = []
+    by_kind: Dict[str, List[float]] = defaultdict(list)
+    for _ in range(repeat):
+        for kind, arg in inputs:
+            start = time.perf_counter()
+            fn(arg)
+            elapsed = time.perf_counter() - start
+            samples.append(elapsed)
+            by_kind[kind].append(elapsed)
+    total = sum(samples)
+    return {
+        "ops_per_sec": len(samples) / total if total else None,
+        "latency": latency_stats(samples),
+        "by_kind": {kind: latency_stats(values) for kind, values in sorted(by_kind.items())},
+    }
+
+
+def run_micro(corpus: List[Tuple[str, bytes]], repeat: int, workdir: str) -> Dict[str, object]:
+    parser = BytesParser(policy=policy.default)
+    prefilter = Prefilter(DEFAULT_RULES)
+    journal = ProgressJournal("BENCH", os.path.join(workdir, "progress.sqlite3"))
+
+    messages: List[Tuple[str, EmailMessage]] = [(kind, parser.parsebytes(raw)) for kind, raw in corpus]
+    headers = [(kind, (parser.parsebytes(_header_bytes(raw), headersonly=True), len(raw))) for kind, raw in corpus]
+    originals = [(kind, get_original_message_and_headers(msg)[0]) for kind, msg in messages]
+    outputs: List[Tuple[str, Tuple[int, EmailOutput]]] = []
+    for i, (kind, msg) in enumerate(originals):
+        output = EmailOutput.model_validate({
+            "from": msg.get("From"),
+            "to": [str(msg.get("To") or "")],
+            "subject": msg.get("Subject"),
+            "text": extract_text(msg)[:2000],
+            "date": msg.get("Date"),
+            "message_id": msg.get("Message-Id"),
+        })
+        outputs.append((kind, (i, output)))
+
+    def write(arg):
+        i, output = arg
+        write_email_json(output, path=os.path.join(workdir, "emails", f"{i}.json"))
+
+    def record(arg):
+        i, output = arg
+        journal.record_analyzed(1, str(i).encode(), output, output.date, f"{i}.json")
+
+    stages: Dict[str, Tuple[List[Tuple[str, object]], Callable[[object], object]]] = {
+        "parse_message": (list(corpus), parser.parsebytes),
+        "parse_headers": ([(k, _header_bytes(r)) for k, r in corpus], lambda b: parser.parsebytes(b, headersonly=True)),
+        "prefilter_route": (headers, lambda h: prefilter.route(*h)),
+        "forward_chain": (messages, resolve_forward_chain),
+        "extract_text": (originals, extract_text),
+        "write_json": (outputs, write),
+        "journal_record": (outputs, record),
+    }
+    try:
+        return {name: _time_stage(inputs, fn, repeat) for name, (inputs, fn) in stages.items()}
+    finally:
+        journal.close()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Per-stage microbenchmarks")
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kinds", default=",".join(KINDS))
+    parser.add_argument("--attachment-size", type=int, default=1024 * 1024)
+    parser.add_argument("--out", default=None, help="Results directory (default bench_results/)")
+    args = parser.parse_args(argv)
+
+    corpus = generate_corpus(args.count, args.seed, args.kinds.split(","), args.attachment_size)
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_micro(corpus, args.repeat, workdir)
+    params = {
+        "count": args.count,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "kinds": args.kinds.split(","),
+        "attachment_size": args.attachment_size,
+    }
+    path = write_results("micro", params, results, args.out)
+    for name, stage in results.items():
+        lat = stage["latency"]
+        print(f"{name:16s} {stage['ops_per_sec'] or 0:10.1f} ops/s  p50 {lat['p50_ms']:.3f} ms  p99 {lat['p99_ms']:.3f} ms")
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
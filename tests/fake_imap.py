@@ -0,0 +1,369 @@
+"""
+Minimal in-process IMAP4rev1 server for tests.
+
+Speaks just enough of the protocol for imaplib and IMAPReader: LOGIN, SELECT,
+UID SEARCH, UID FETCH and UID STORE, with optional CONDSTORE (MODSEQ and
+UNCHANGEDSINCE). The mailbox is shared between connections, so several
+clients can race against it like workers against a real server.
+"""
+from __future__ import annotations
+
+import bisect
+import re
+import socketserver
+import threading
+from email import policy
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+TOKEN_RE = re.compile(rb'"((?:[^"\\]|\\.)*)"')
+
+
+class FakeMessage:
+    def __init__(self, uid: int, raw: bytes, flags: Iterable[str], modseq: int) -> None:
+        self.uid = uid
+        self.raw = raw
+        self.flags: Set[str] = set(flags)
+        self.modseq = modseq
+
+    @property
+    def header(self) -> bytes:
+        end = self.raw.find(b"\r\n\r\n")
+        if end >= 0:
+            return self.raw[: end + 4]
+        end = self.raw.find(b"\n\n")
+        if end >= 0:
+            return self.raw[: end + 2]
+        return self.raw
+
+
+class FakeMailbox:
+    """A single folder; all state changes go through the lock."""
+
+    def __init__(self, uidvalidity: int = 1) -> None:
+        self.uidvalidity = uidvalidity
+        self.lock = threading.Lock()
+        self.uids: List[int] = []
+        self.messages: Dict[int, FakeMessage] = {}
+        self.next_uid = 1
+        self.highest_modseq = 1
+
+    def add(self, raw: bytes, flags: Iterable[str] = ()) -> int:
+        if b"\r\n" not in raw:
+            raw = raw.replace(b"\n", b"\r\n")
+        with self.lock:
+            uid = self.next_uid
+            self.next_uid += 1
+            self.highest_modseq += 1
+            self.messages[uid] = FakeMessage(uid, raw, flags, self.highest_modseq)
+            self.uids.append(uid)
+            return uid
+
+    def add_message(self, msg, flags: Iterable[str] = ()) -> int:
+        return self.add(msg.as_bytes(policy=policy.SMTP), flags)
+
+    def flags(self, uid: int) -> Set[str]:
+        with self.lock:
+            return set(self.messages[uid].flags)
+
+    def seq(self, uid: int) -> int:
+        return bisect.bisect_left(self.uids, uid) + 1
+
+    def resolve(self, uid_set: str) -> List[int]:
+        top = self.uids[-1] if self.uids else 0
+        wanted: Set[int] = set()
+        for piece in uid_set.split(","):
+            if ":" in piece:
+                lo_s, hi_s = piece.split(":", 1)
+                lo = top if lo_s == "*" else int(lo_s)
+                hi = top if hi_s == "*" else int(hi_s)
+                lo, hi = min(lo, hi), max(lo, hi)
+                wanted.update(u for u in self.uids if lo <= u <= hi)
+            else:
+                u = top if piece == "*" else int(piece)
+                if u in self.messages:
+                    wanted.add(u)
+        return sorted(wanted)
+
+    def set_flags(self, msg: FakeMessage, new_flags: Set[str]) -> bool:
+        if new_flags == msg.flags:
+            return False
+        msg.flags = new_flags
+        self.highest_modseq += 1
+        msg.modseq = self.highest_modseq
+        return True
+
+
+def tokenize(line: bytes) -> List[str]:
+    """Splits a command line into atoms, quoted strings and (...)/[...] groups."""
+    tokens: List[str] = []
+    i = 0
+    n = len(line)
+    while i < n:
+        c = line[i:i + 1]
+        if c == b" ":
+            i += 1
+            continue
+        if c == b'"':
+            m = TOKEN_RE.match(line, i)
+            if not m:
+                raise ValueError("unterminated quoted string")
+            tokens.append(re.sub(rb"\\(.)", rb"\1", m.group(1)).decode("utf-8"))
+            i = m.end()
+            continue
+        depth = 0
+        start = i
+        while i < n:
+            c = line[i:i + 1]
+            if c in (b"(", b"["):
+                depth += 1
+            elif c in (b")", b"]"):
+                depth -= 1
+            elif c == b" " and depth == 0:
+                break
+            i += 1
+        tokens.append(line[start:i].decode("utf-8"))
+    return tokens
+
+
+def unparen(token: str) -> List[str]:
+    if token.startswith("(") and token.endswith(")"):
+        token = token[1:-1]
+    return tokenize(token.encode("utf-8"))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "_TCPServer"
+    # Small writes would otherwise stall on Nagle + delayed ACK and skew timings
+    disable_nagle_algorithm = True
+
+    def send(self, data: bytes) -> None:
+        self.wfile.write(data)
+
+    def line(self, text: str) -> None:
+        self.send(text.encode("utf-8") + b"\r\n")
+
+    def handle(self) -> None:
+        self.line("* OK fake IMAP ready")
+        self.selected = False
+        self.authenticated = False
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            raw = raw.rstrip(b"\r\n")
+            if not raw:
+                continue
+            try:
+                tokens = tokenize(raw)
+                tag, command, args = tokens[0], tokens[1].upper(), tokens[2:]
+            except (ValueError, IndexError):
+                self.line("* BAD malformed command")
+                continue
+            self.server.fake.commands.append(" ".join([command] + args))
+            if not self.dispatch(tag, command, args):
+                return
+
+    def dispatch(self, tag: str, command: str, args: List[str]) -> bool:
+        fake = self.server.fake
+        if command == "CAPABILITY":
+            self.line("* CAPABILITY " + " ".join(fake.capabilities(self.authenticated)))
+        elif command == "LOGIN":
+            if fake.credentials is not None and tuple(args[:2]) != fake.credentials:
+                self.line(f"{tag} NO [AUTHENTICATIONFAILED] Invalid credentials")
+                return True
+            self.authenticated = True
+        elif command in ("SELECT", "EXAMINE"):
+            box = fake.mailbox
+            with box.lock:
+                exists = len(box.uids)
+                next_uid = box.next_uid
+                modseq = box.highest_modseq
+            self.line("* FLAGS (\\Answered \\Flagged \\Deleted \\Seen \\Draft)")
+            self.line(f"* {exists} EXISTS")
+            self.line("* 0 RECENT")
+            self.line(f"* OK [UIDVALIDITY {box.uidvalidity}] UIDs valid")
+            self.line(f"* OK [UIDNEXT {next_uid}] Predicted next UID")
+            self.line("* OK [PERMANENTFLAGS (\\Answered \\Flagged \\Deleted \\Seen \\Draft \\*)] Limited")
+            if fake.condstore:
+                self.line(f"* OK [HIGHESTMODSEQ {modseq}] Highest")
+            self.selected = True
+            mode = "READ-ONLY" if command == "EXAMINE" else "READ-WRITE"
+            self.line(f"{tag} OK [{mode}] {command} completed")
+            return True
+        elif command in ("NOOP", "CHECK"):
+            pass
+        elif command == "CLOSE":
+            self.selected = False
+        elif command == "LOGOUT":
+            self.line("* BYE logging out")
+            self.line(f"{tag} OK LOGOUT completed")
+            return False
+        elif command == "UID" and self.selected and args:
+            sub = args[0].upper()
+            if sub == "SEARCH":
+                self.uid_search(args[1:])
+            elif sub == "FETCH":
+                self.uid_fetch(args[1], unparen(args[2]) if len(args) > 2 else [])
+            elif sub == "STORE":
+                if fake.refuse_store:
+                    self.line(f"{tag} NO Permission denied")
+                else:
+                    self.uid_store(tag, args[1:])
+                return True
+            else:
+                self.line(f"{tag} BAD unsupported UID {sub}")
+                return True
+        else:
+            self.line(f"{tag} BAD unsupported command {command}")
+            return True
+        self.line(f"{tag} OK {command} completed")
+        return True
+
+    def uid_search(self, criteria: List[str]) -> None:
+        box = self.server.fake.mailbox
+        crit = [c.upper() for c in criteria]
+        with box.lock:
+            found = []
+            for uid in box.uids:
+                flags = box.messages[uid].flags
+                if "UNSEEN" in crit and "\\Seen" in flags:
+                    continue
+                if "SEEN" in crit and "\\Seen" not in flags:
+                    continue
+                found.append(uid)
+        self.line("* SEARCH" + "".join(f" {u}" for u in found))
+
+    def uid_fetch(self, uid_set: str, items: List[str]) -> None:
+        box = self.server.fake
+        mailbox = box.mailbox
+        names = [i.upper() for i in items]
+        with mailbox.lock:
+            uids = mailbox.resolve(uid_set)
+            for uid in uids:
+                msg = mailbox.messages[uid]
+                if any(n in ("BODY[]", "RFC822") for n in names):
+                    mailbox.set_flags(msg, msg.flags | {"\\Seen"})
+                parts: List[bytes] = [f"UID {uid}".encode()]
+                literals: List[Tuple[str, bytes]] = []
+                for n in names:
+                    if n == "UID":
+                        continue
+                    if n == "FLAGS":
+                        parts.append(f"FLAGS ({' '.join(sorted(msg.flags))})".encode())
+                    elif n == "MODSEQ" and box.condstore:
+                        parts.append(f"MODSEQ ({msg.modseq})".encode())
+                    elif n == "RFC822.SIZE":
+                        parts.append(f"RFC822.SIZE {len(msg.raw)}".encode())
+                    elif n in ("BODY.PEEK[]", "BODY[]", "RFC822"):
+                        literals.append(("RFC822" if n == "RFC822" else "BODY[]", msg.raw))
+                    elif n in ("BODY.PEEK[HEADER]", "BODY[HEADER]"):
+                        literals.append(("BODY[HEADER]", msg.header))
+                    elif n == "RFC822.HEADER":
+                        literals.append(("RFC822.HEADER", msg.header))
+                out = f"* {mailbox.seq(uid)} FETCH (".encode() + b" ".join(parts)
+                for name, data in literals:
+                    out += f" {name} {{{len(data)}}}\r\n".encode() + data
+                self.send(out + b")\r\n")
+
+    def uid_store(self, tag: str, args: List[str]) -> None:
+        fake = self.server.fake
+        mailbox = fake.mailbox
+        uid_set, rest = args[0], args[1:]
+        unchanged_since: Optional[int] = None
+        if rest and rest[0].startswith("("):
+            modifier = unparen(rest[0])
+            if len(modifier) != 2 or modifier[0].upper() != "UNCHANGEDSINCE" or not fake.condstore:
+                self.line(f"{tag} BAD unsupported STORE modifier")
+                return
+            unchanged_since = int(modifier[1])
+            rest = rest[1:]
+        op = rest[0].upper()
+        flags = set(unparen(rest[1])) if rest[1].startswith("(") else set(rest[1:])
+        silent = op.endswith(".SILENT")
+        op = op.replace(".SILENT", "")
+        modified: List[int] = []
+        with mailbox.lock:
+            for uid in mailbox.resolve(uid_set):
+                msg = mailbox.messages[uid]
+                if unchanged_since is not None and msg.modseq > unchanged_since:
+                    modified.append(uid)
+                    continue
+                if op == "+FLAGS":
+                    new_flags = msg.flags | flags
+                elif op == "-FLAGS":
+                    new_flags = msg.flags - flags
+                else:
+                    new_flags = set(flags)
+                mailbox.set_flags(msg, new_flags)
+                if not silent:
+                    modseq = f" MODSEQ ({msg.modseq})" if fake.condstore else ""
+                    self.line(
+                        f"* {mailbox.seq(uid)} FETCH (UID {uid} FLAGS ({' '.join(sorted(msg.flags))}){modseq})"
+                    )
+        if modified:
+            self.line(f"{tag} OK [MODIFIED {','.join(str(u) for u in modified)}] Conditional STORE failed")
+        else:
+            self.line(f"{tag} OK STORE completed")
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    fake: "FakeIMAPServer"
+
+
+class FakeIMAPServer:
+    """
+    Usage:
+        with FakeIMAPServer() as server:
+            server.mailbox.add(raw_bytes)
+            reader = IMAPReader("127.0.0.1", server.port, False, "u", "p")
+    """
+
+    def __init__(
+        self,
+        mailbox: Optional[FakeMailbox] = None,
+        condstore: bool = True,
+        credentials: Optional[Tuple[str, str]] = None,
+    ) -> None:
+        self.mailbox = mailbox or FakeMailbox()
+        self.condstore = condstore
+        self.credentials = credentials
+        # When set, UID STORE is refused with a plain NO (e.g. missing ACL rights)
+        self.refuse_store = False
+        # Untagged command lines in arrival order, across all connections
+        self.commands: List[str] = []
+        self._server: Optional[_TCPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def capabilities(self, authenticated: bool) -> List[str]:
+        # Like Dovecot and Gmail, extensions are only advertised after LOGIN
+        caps = ["IMAP4rev1", "UIDPLUS"]
+        if self.condstore and authenticated:
+            caps.append("CONDSTORE")
+        return caps
+
+    @property
+    def port(self) -> int:
+        if self._server is None:
+            raise RuntimeError("server is not running")
+        return self._server.server_address[1]
+
+    def start(self) -> "FakeIMAPServer":
+        self._server = _TCPServer(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeIMAPServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
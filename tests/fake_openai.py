@@ -0,0 +1,153 @@
+"""
+In-process stand-in for the OpenAI chat-completions endpoint.
+
+Answers POST /v1/chat/completions with a JSON object built from the "Headers"
+section of the prompt, after a configurable delay. A seeded fraction of
+requests is answered with 429 to exercise the client's retry path. Point the
+SDK at it with OPENAI_BASE_URL=<server.base_url>.
+"""
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+
+
+def fake_completion_content(prompt: str) -> Dict[str, Any]:
+    headers: Dict[str, str] = {}
+    head, _, body = prompt.partition("\n\n")
+    for line in head.splitlines()[1:]:
+        key, sep, value = line.partition(":")
+        if sep:
+            headers[key.strip()] = value.strip()
+    body = body.partition("\n")[2]
+    to = [a.strip() for a in headers.get("To", "").split(",") if a.strip()]
+    return {
+        "from": headers.get("From"),
+        "to": to,
+        "subject": headers.get("Subject"),
+        "text": body[:500] or None,
+        "date": headers.get("Date"),
+        "message_id": headers.get("Message-Id"),
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_HTTPServer"
+    protocol_version = "HTTP/1.1"
+    # Small writes would otherwise stall on Nagle + delayed ACK and skew timings
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def send_json(self, status: int, data: Dict[str, Any], extra: Optional[Dict[str, str]] = None) -> None:
+        payload = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for k, v in (extra or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self) -> None:
+        fake = self.server.fake
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+        rate_limited, delay = fake.next_outcome()
+        if delay > 0:
+            time.sleep(delay)
+        if rate_limited:
+            self.send_json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                {"Retry-After": str(fake.retry_after)},
+            )
+            return
+        messages = request.get("messages") or []
+        prompt = messages[-1].get("content", "") if messages else ""
+        content = json.dumps(fake_completion_content(prompt))
+        self.send_json(200, {
+            "id": f"chatcmpl-fake-{fake.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        })
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: "FakeOpenAIServer"
+
+
+class FakeOpenAIServer:
+    """
+    Usage:
+        with FakeOpenAIServer(latency=0.2, rate_429=0.05) as server:
+            os.environ["OPENAI_BASE_URL"] = server.base_url
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_429: float = 0.0,
+        retry_after: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self._server: Optional[_HTTPServer] = None
+
+    def next_outcome(self) -> Tuple[bool, float]:
+        with self._lock:
+            self.requests += 1
+            limited = self._rng.random() < self.rate_429
+            if limited:
+                self.rate_limited += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        return limited, delay
+
+    @property
+    def base_url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("server is not running")
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._server = _HTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,80 @@
+import json
+import unittest
+import urllib.error
+import urllib.request
+from email import policy
+from email.parser import BytesParser
+
+from bench.common import latency_stats, percentile
+from bench.corpus import KINDS, generate_corpus
+from bench.load import PROCESSED_RE
+from tests.fake_openai import FakeOpenAIServer
+
+
+def post_completion(base_url, prompt):
+    body = json.dumps({"model": "m", "messages": [{"role": "user", "content": prompt}]}).encode("utf-8")
+    req = urllib.request.Request(
+        base_url + "/chat/completions", data=body, headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(req, timeout=10) as resp:
+        return json.loads(resp.read())
+
+
+class TestCorpus(unittest.TestCase):
+    def test_deterministic(self):
+        a = generate_corpus(len(KINDS) * 2, seed=3, attachment_size=4096)
+        b = generate_corpus(len(KINDS) * 2, seed=3, attachment_size=4096)
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, generate_corpus(len(KINDS) * 2, seed=4, attachment_size=4096))
+
+    def test_kinds_parse(self):
+        corpus = dict(generate_corpus(len(KINDS), attachment_size=4096))
+        self.assertEqual(set(corpus), set(KINDS))
+        parser = BytesParser(policy=policy.default)
+        for kind, raw in corpus.items():
+            msg = parser.parsebytes(raw)
+            self.assertIsNotNone(msg.get("From"), kind)
+        nested = parser.parsebytes(corpus["nested"])
+        self.assertTrue(any(p.get_content_type() == "message/rfc822" for p in nested.walk()))
+        self.assertIn(b"Forwarded message", corpus["forwarded"])
+        self.assertEqual(parser.parsebytes(corpus["html"]).get_content_type(), "text/html")
+        self.assertGreater(len(corpus["attachment"]), 4096)
+        charset = parser.parsebytes(corpus["non_utf8"]).get_content_charset()
+        self.assertNotIn(charset, ("utf-8", "us-ascii"))
+
+
+class TestStats(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertIsNone(percentile([], 50))
+        self.assertEqual(latency_stats([0.001, 0.003])["max_ms"], 3.0)
+
+    def test_processed_line(self):
+        m = PROCESSED_RE.match("Processed UID 12: /tmp/emails/2025 10 13 a (b).json (0.125s)")
+        self.assertEqual((m.group(1), float(m.group(2))), ("12", 0.125))
+        self.assertIsNone(PROCESSED_RE.match("Recovered UID 12: /tmp/x.json"))
+
+
+class TestFakeOpenAI(unittest.TestCase):
+    PROMPT = "Headers:\nFrom: A <a@example.com>\nTo: B <b@example.com>, C <c@example.com>\n\nBody:\nHello"
+
+    def test_completion_from_headers(self):
+        with FakeOpenAIServer() as server:
+            resp = post_completion(server.base_url, self.PROMPT)
+        data = json.loads(resp["choices"][0]["message"]["content"])
+        self.assertEqual(data["from"], "A <a@example.com>")
+        self.assertEqual(data["to"], ["B <b@example.com>", "C <c@example.com>"])
+        self.assertEqual(data["text"], "Hello")
+
+    def test_rate_limit_injection(self):
+        with FakeOpenAIServer(rate_429=1.0) as server:
+            with self.assertRaises(urllib.error.HTTPError) as ctx:
+                post_completion(server.base_url, self.PROMPT)
+            self.assertEqual(ctx.exception.code, 429)
+            self.assertEqual(server.rate_limited, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+# Guard tests if pydantic is not installed (used by models)
+try:
+    import pydantic  # noqa: F401
+    PYDANTIC_AVAILABLE = True
+except Exception:
+    PYDANTIC_AVAILABLE = False
+
+if PYDANTIC_AVAILABLE:
+    from app.file_store import plan_email_path, write_email_json
+    from app.models import EmailOutput
+
+
+@unittest.skipUnless(PYDANTIC_AVAILABLE, "pydantic not installed")
+class TestPlanEmailPath(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = mock.patch("app.file_store.EMAILS_DIR", self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_concurrent_plans_get_distinct_paths(self):
+        output = EmailOutput(subject="Same", date="Mon, 13 Oct 2025 09:00:00 +0000")
+        paths = []
+        barrier = threading.Barrier(8)
+
+        def plan():
+            barrier.wait()
+            paths.append(plan_email_path(output))
+
+        threads = [threading.Thread(target=plan) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(set(paths)), 8)
+
+    def test_write_replaces_reserved_placeholder(self):
+        output = EmailOutput(subject="S")
+        path = plan_email_path(output)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(write_email_json(output, path=path), path)
+        self.assertNotEqual(plan_email_path(output), path)
+        with open(path, "r", encoding="utf-8") as f:
+            self.assertIn('"subject": "S"', f.read())
+        self.assertEqual([n for n in os.listdir(self.tmp.name) if n.endswith(".tmp")], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+from unittest import mock
 from email import policy
 from email.parser import BytesParser
 
@@ -11,7 +12,9 @@ except Exception:
 
 from app.forward_parser import (
     get_original_message_and_headers,
+    parse_forward_chain,
     parse_inline_forwarded_headers,
+    resolve_forward_chain,
     strip_header_block_from_text,
 )
 from app.body_extractor import extract_text
@@ -72,6 +75,123 @@ EML_INLINE = ("\r\n".join([
     "",
 ]).encode("utf-8"))
 
+TEXT_CHAIN = "\n".join([
+    "FYI",
+    "",
+    "---------- Forwarded message ---------",
+    "From: Carol <carol@example.com>",
+    "Date: Wed, 15 Oct 2025 09:00:00 +0000",
+    "Subject: Fwd: Fwd: Budget",
+    "To: Dave <dave@example.com>",
+    "",
+    "See Bob's note.",
+    "",
+    "---------- Forwarded message ---------",
+    "From: Bob <bob@example.com>",
+    "Date: Tue, 14 Oct 2025 09:00:00 +0000",
+    "Subject: Fwd: Budget",
+    "To: Carol <carol@example.com>",
+    "",
+    "Begin forwarded message:",
+    "",
+    "From: Alice <alice@example.com>",
+    "To: Bob <bob@example.com>,",
+    " Team <team@example.com>",
+    "Subject: Budget",
+    "Date: Mon, 13 Oct 2025 09:00:00 +0000",
+    "",
+    "The original budget text.",
+    "",
+])
+
+
+def wrap_rfc822(inner: bytes, sender: bytes, boundary: bytes) -> bytes:
+    return b"\r\n".join([
+        b"From: " + sender,
+        b"Subject: Fwd",
+        b"MIME-Version: 1.0",
+        b"Content-Type: multipart/mixed; boundary=" + boundary,
+        b"",
+        b"--" + boundary,
+        b"Content-Type: text/plain; charset=\"utf-8\"",
+        b"",
+        b"Forwarding.",
+        b"",
+        b"--" + boundary,
+        b"Content-Type: message/rfc822",
+        b"",
+        inner,
+        b"--" + boundary + b"--",
+        b"",
+    ])
+
+
+class TestForwardChain(unittest.TestCase):
+    def test_nested_inline_chain(self):
+        chain = parse_forward_chain(TEXT_CHAIN)
+        self.assertEqual(len(chain), 3)
+        self.assertIn("carol@example.com", chain[0].headers["From"])
+        self.assertIn("bob@example.com", chain[1].headers["From"])
+        original = chain[-1]
+        self.assertIn("alice@example.com", original.headers["From"])
+        self.assertIn("team@example.com", original.headers["To"])
+        self.assertEqual(TEXT_CHAIN[original.block_end:original.body_end].strip(), "The original budget text.")
+        # Each forward's body stops where the next one begins
+        self.assertEqual(TEXT_CHAIN[chain[0].block_end:chain[0].body_end].strip(), "See Bob's note.")
+
+    def test_legacy_helpers_use_innermost(self):
+        headers, block_range = parse_inline_forwarded_headers(TEXT_CHAIN)
+        self.assertIn("alice@example.com", headers["From"])
+        cleaned = strip_header_block_from_text(TEXT_CHAIN, block_range)
+        self.assertNotIn("alice@example.com", cleaned)
+        self.assertTrue(cleaned.rstrip().endswith("The original budget text."))
+
+    def test_unmarked_only_near_top(self):
+        self.assertEqual(len(parse_forward_chain("From: a@example.com\nTo: b@example.com\n\nbody")), 1)
+        far = "\n" * 60 + "From: a@example.com\n\nbody"
+        self.assertEqual(parse_forward_chain(far), [])
+        self.assertEqual(parse_forward_chain("To: whom it may concern\n\nbody", allow_unmarked=False), [])
+
+    def test_outlook_sent_header(self):
+        text = "Forwarded message:\r\nFrom: A <a@example.com>\r\nSent: Monday\r\nTo: B\r\n\r\nbody\r\n"
+        headers = parse_forward_chain(text)[0].headers
+        self.assertEqual(headers["Date"], "Monday")
+        self.assertEqual(headers["To"], "B")
+
+
+@unittest.skipUnless(BS4_AVAILABLE, "beautifulsoup4 not installed")
+class TestResolveForwardChain(unittest.TestCase):
+    def test_nested_rfc822(self):
+        inner = EML_EMBEDDED.replace(b"Wrapper <wrapper@example.com>", b"Middle <middle@example.com>")
+        raw = wrap_rfc822(inner, b"Top <top@example.com>", b"top")
+        msg = BytesParser(policy=policy.default).parsebytes(raw)
+        chain = resolve_forward_chain(msg)
+        self.assertEqual([level.method for level in chain], ["rfc822", "rfc822"])
+        original, inline_headers, cleaned_text, method = get_original_message_and_headers(msg)
+        self.assertEqual(method, "rfc822")
+        self.assertIn("sender@example.com", original.get("From"))
+        self.assertEqual(inline_headers, {})
+        self.assertEqual(cleaned_text, extract_text(original))
+
+    def test_inline_inside_rfc822(self):
+        raw = wrap_rfc822(EML_INLINE, b"Top <top@example.com>", b"top")
+        msg = BytesParser(policy=policy.default).parsebytes(raw)
+        original, inline_headers, cleaned_text, method = get_original_message_and_headers(msg)
+        self.assertEqual(method, "inline")
+        self.assertIn("wrapper@example.com", original.get("From"))
+        self.assertIn("sender2@example.com", inline_headers["From"])
+        self.assertTrue(cleaned_text.startswith("This is the original inline body."))
+
+    def test_top_level_text_extracted_once(self):
+        raw = b"From: A <a@example.com>\r\nSubject: Plain\r\n\r\nJust a message.\r\n"
+        msg = BytesParser(policy=policy.default).parsebytes(raw)
+        with mock.patch("app.body_extractor.extract_text", wraps=extract_text) as spy:
+            original, inline_headers, cleaned_text, method = get_original_message_and_headers(msg)
+        self.assertEqual(method, "top")
+        self.assertIs(original, msg)
+        self.assertEqual(cleaned_text.strip(), "Just a message.")
+        self.assertEqual(spy.call_count, 1)
+
 
 @unittest.skipUnless(BS4_AVAILABLE, "beautifulsoup4 not installed")
 class TestForwardParser(unittest.TestCase):
@@ -84,6 +204,7 @@ class TestForwardParser(unittest.TestCase):
         self.assertIn("to1@example.com", original.get("To"))
         body = extract_text(original)
         self.assertIn("Inner body text", body)
+        self.assertEqual(cleaned_text, body)
 
     def test_inline_forward_headers(self):
         msg = BytesParser(policy=policy.default).parsebytes(EML_INLINE)
@@ -0,0 +1,172 @@
+import os
+import tempfile
+import unittest
+
+# Guard tests if pydantic is not installed (used by models)
+try:
+    import pydantic  # noqa: F401
+    PYDANTIC_AVAILABLE = True
+except Exception:
+    PYDANTIC_AVAILABLE = False
+
+if PYDANTIC_AVAILABLE:
+    from app.journal import STAGE_DONE, STAGE_WRITTEN, STAGE_ANALYZED, ProgressJournal
+    from app.models import EmailOutput
+
+# The CLI additionally needs click, python-dotenv and the OpenAI SDK
+try:
+    from tests.cli_runner import run_cli
+    from tests.fake_imap import FakeIMAPServer
+    from tests.fake_openai import FakeOpenAIServer
+    CLI_AVAILABLE = True
+except Exception:
+    CLI_AVAILABLE = False
+
+
+def _raw(subject):
+    return "\r\n".join([
+        "From: Sender <sender@example.com>",
+        "To: Someone <someone@example.com>",
+        f"Subject: {subject}",
+        "Date: Mon, 13 Oct 2025 09:00:00 +0000",
+        "",
+        "Body.",
+        "",
+    ]).encode()
+
+
+@unittest.skipUnless(PYDANTIC_AVAILABLE, "pydantic not installed")
+class TestProgressJournal(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "progress.sqlite3")
+        self.journal = ProgressJournal("INBOX", self.path)
+
+    def tearDown(self):
+        self.journal.close()
+        self.tmp.cleanup()
+
+    def test_pending_until_done(self):
+        result = EmailOutput.model_validate({"from": "a@example.com", "to": ["b@example.com"], "subject": "S"})
+        self.journal.record_analyzed(7, b"42", result, "Mon, 12 Oct 2025 12:12:12 +0000", "/tmp/x.json")
+        self.assertEqual(self.journal.get_stage(7, b"42"), STAGE_ANALYZED)
+        self.assertIsNone(self.journal.get_stage(8, b"42"))
+
+        pending = self.journal.pending()
+        self.assertEqual(len(pending), 1)
+        self.assertEqual(pending[0].uid, b"42")
+        self.assertEqual(pending[0].result.from_, "a@example.com")
+        self.assertEqual(pending[0].out_path, "/tmp/x.json")
+
+        self.journal.set_stage(7, b"42", STAGE_WRITTEN)
+        self.assertEqual(self.journal.pending()[0].stage, STAGE_WRITTEN)
+        self.journal.set_stage(7, b"42", STAGE_DONE)
+        self.assertEqual(self.journal.pending(), [])
+
+    def test_done_drops_payload(self):
+        result = EmailOutput.model_validate({"subject": "S", "text": "x" * 1000})
+        self.journal.record_analyzed(7, b"42", result, "Mon, 12 Oct 2025 12:12:12 +0000", "/tmp/x.json")
+        self.journal.set_stage(7, b"42", STAGE_DONE)
+        row = self.journal.db.execute("SELECT stage, result, fallback_date, out_path FROM progress").fetchone()
+        self.assertEqual(row, (STAGE_DONE, None, None, None))
+        self.assertEqual(self.journal.get_stage(7, b"42"), STAGE_DONE)
+
+    def test_prune_done(self):
+        for uid in (b"1", b"2", b"3"):
+            self.journal.record_analyzed(7, uid, EmailOutput(subject="S"), None, "/tmp/x.json")
+        self.journal.set_stage(7, b"1", STAGE_DONE)
+        self.journal.set_stage(7, b"2", STAGE_DONE)
+        self.journal.db.execute("UPDATE progress SET updated_at = 0 WHERE uid = '1'")
+        self.assertEqual(self.journal.prune_done(), 1)
+        self.assertIsNone(self.journal.get_stage(7, b"1"))
+        self.assertEqual(self.journal.get_stage(7, b"2"), STAGE_DONE)
+        self.assertEqual(self.journal.prune_done(older_than=-1), 1)
+        # Unfinished entries are never pruned
+        self.assertEqual(self.journal.get_stage(7, b"3"), STAGE_ANALYZED)
+
+    def test_survives_reopen(self):
+        result = EmailOutput(subject="S")
+        self.journal.record_analyzed(1, b"5", result, None, "/tmp/y.json")
+        self.journal.close()
+        self.journal = ProgressJournal("INBOX", self.path)
+        self.assertEqual(self.journal.get_stage(1, b"5"), STAGE_ANALYZED)
+        self.assertEqual(ProgressJournal("Other", self.path).pending(), [])
+
+
+@unittest.skipUnless(CLI_AVAILABLE, "click, python-dotenv or openai not installed")
+class TestRunResume(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal_path = os.path.join(self.tmp.name, "progress.sqlite3")
+        self.out_path = os.path.join(self.tmp.name, "recovered.json")
+        self.imap = FakeIMAPServer().start()
+        self.llm = FakeOpenAIServer().start()
+        self.journaled = str(self.imap.mailbox.add(_raw("Journaled"))).encode()
+        self.fresh = str(self.imap.mailbox.add(_raw("Fresh"))).encode()
+        journal = ProgressJournal("INBOX", self.journal_path)
+        result = EmailOutput.model_validate({"from": "sender@example.com", "subject": "Journaled"})
+        journal.record_analyzed(self.imap.mailbox.uidvalidity, self.journaled, result, None, self.out_path)
+        journal.close()
+
+    def tearDown(self):
+        self.llm.stop()
+        self.imap.stop()
+        self.tmp.cleanup()
+
+    def invoke(self, mark_seen):
+        result = run_cli(
+            self.imap, self.llm, self.tmp.name,
+            MARK_SEEN="true" if mark_seen else "false", PREFILTER="false", JOURNAL_PATH=self.journal_path,
+        )
+        self.assertEqual(result.exit_code, 0, result.output)
+        return result
+
+    def stage(self, uid):
+        journal = ProgressJournal("INBOX", self.journal_path)
+        try:
+            return journal.get_stage(self.imap.mailbox.uidvalidity, uid)
+        finally:
+            journal.close()
+
+    def test_resume_before_new_work(self):
+        result = self.invoke(mark_seen=True)
+        with open(self.out_path, "r", encoding="utf-8") as f:
+            self.assertIn("Journaled", f.read())
+
+        commands = self.imap.commands
+        seen = commands.index(f"UID STORE {self.journaled.decode()} +FLAGS (\\Seen)")
+        search = next(i for i, c in enumerate(commands) if c.startswith("UID SEARCH"))
+        fetches = [i for i, c in enumerate(commands) if c.startswith("UID FETCH")]
+        self.assertLess(seen, search)
+        self.assertTrue(all(seen < i for i in fetches))
+        self.assertIn("\\Seen", self.imap.mailbox.flags(int(self.journaled)))
+
+        # Only the fresh message reaches OpenAI
+        self.assertEqual(self.llm.requests, 1)
+        self.assertIn(f"Processed UID {self.fresh.decode()}", result.output)
+        self.assertEqual(self.stage(self.journaled), STAGE_DONE)
+
+    def test_refused_seen_store_retried(self):
+        # imaplib reports a refused STORE as NO instead of raising
+        self.imap.refuse_store = True
+        self.invoke(mark_seen=True)
+        self.assertEqual(self.stage(self.journaled), STAGE_WRITTEN)
+        self.assertEqual(self.stage(self.fresh), STAGE_WRITTEN)
+
+        self.imap.refuse_store = False
+        self.invoke(mark_seen=True)
+        for uid in (self.journaled, self.fresh):
+            self.assertEqual(self.stage(uid), STAGE_DONE)
+            self.assertIn("\\Seen", self.imap.mailbox.flags(int(uid)))
+        self.assertEqual(self.llm.requests, 1)
+
+    def test_journaled_uid_skipped_while_unseen(self):
+        result = self.invoke(mark_seen=False)
+        self.assertTrue(os.path.exists(self.out_path))
+        self.assertNotIn(f"Processed UID {self.journaled.decode()}:", result.output)
+        self.assertNotIn(f"UID FETCH {self.journaled.decode()} (BODY.PEEK[])", self.imap.commands)
+        self.assertEqual(self.llm.requests, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
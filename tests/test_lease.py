@@ -0,0 +1,247 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from app.imap_reader import IMAPReader
+from app.lease import LEASE_PREFIX, LeaseManager, make_lease_keyword, parse_lease_keyword
+from tests.fake_imap import FakeIMAPServer
+
+# Guard tests if the OpenAI SDK is not installed
+try:
+    from app.openai_client import MIN_ANALYZE_BUDGET, MIN_REQUEST_TIMEOUT, analyze_time_bound, request_timeout_within
+    OPENAI_AVAILABLE = True
+except Exception:
+    OPENAI_AVAILABLE = False
+
+# The CLI additionally needs click, python-dotenv and pydantic
+try:
+    from app.cli import OpenAIEmailProcessor
+    from tests.cli_runner import run_cli, spawn_cli
+    from tests.fake_openai import FakeOpenAIServer
+    CLI_AVAILABLE = True
+except Exception:
+    CLI_AVAILABLE = False
+
+RAW = b"\r\n".join([
+    b"From: Sender <sender@example.com>",
+    b"To: Someone <someone@example.com>",
+    b"Subject: Lease test",
+    b"",
+    b"Body.",
+    b"",
+])
+
+
+class TestLeaseKeyword(unittest.TestCase):
+    def test_round_trip(self):
+        kw = make_lease_keyword("host-1.a", 1700000000)
+        self.assertTrue(kw.startswith(LEASE_PREFIX))
+        lease = parse_lease_keyword(b"7", kw)
+        self.assertEqual(lease.worker_id, "host-1.a")
+        self.assertEqual(lease.expires, 1700000000)
+
+    def test_ignores_other_flags(self):
+        self.assertIsNone(parse_lease_keyword(b"7", "\\Seen"))
+        self.assertIsNone(parse_lease_keyword(b"7", LEASE_PREFIX + "noexpiry"))
+
+
+@unittest.skipUnless(OPENAI_AVAILABLE, "openai not installed")
+class TestAnalyzeBudget(unittest.TestCase):
+    def test_timeout_fits_budget(self):
+        for budget in (MIN_ANALYZE_BUDGET, 108, 540):
+            timeout = request_timeout_within(budget)
+            self.assertGreaterEqual(timeout, MIN_REQUEST_TIMEOUT)
+            self.assertLessEqual(analyze_time_bound(timeout), budget)
+
+    def test_short_budget_rejected(self):
+        with self.assertRaises(ValueError):
+            request_timeout_within(MIN_ANALYZE_BUDGET - 1)
+
+
+class LeaseServerMixin:
+    condstore = True
+
+    def setUp(self):
+        self.server = FakeIMAPServer(condstore=self.condstore).start()
+        self.uid = str(self.server.mailbox.add(RAW)).encode()
+        self.readers = []
+
+    def tearDown(self):
+        for r in self.readers:
+            r.close()
+        self.server.stop()
+
+    def reader(self):
+        r = IMAPReader("127.0.0.1", self.server.port, False, "user", "pass")
+        r.connect()
+        self.readers.append(r)
+        return r
+
+    def test_capabilities_refreshed_after_login(self):
+        reader = self.reader()
+        self.assertNotIn("CONDSTORE", reader.conn.capabilities)
+        self.assertEqual(reader.has_capability("CONDSTORE"), self.condstore)
+
+    def test_second_worker_cannot_claim(self):
+        a = LeaseManager(self.reader(), "a")
+        b = LeaseManager(self.reader(), "b")
+        lease = a.claim(self.uid)
+        self.assertIsNotNone(lease)
+        self.assertIsNone(b.claim(self.uid))
+        a.release(lease)
+        self.assertIsNotNone(b.claim(self.uid))
+
+    def test_expired_lease_reclaimed(self):
+        dead = make_lease_keyword("dead", int(time.time()) - 5)
+        uid = str(self.server.mailbox.add(RAW, flags=[dead])).encode()
+        lease = LeaseManager(self.reader(), "live").claim(uid)
+        self.assertIsNotNone(lease)
+        flags = self.server.mailbox.flags(int(uid))
+        self.assertIn(lease.keyword, flags)
+        self.assertNotIn(dead, flags)
+
+    def test_renew_extends_lease(self):
+        reader = self.reader()
+        lease = LeaseManager(reader, "a", ttl=5).claim(self.uid)
+        renewed = LeaseManager(reader, "a", ttl=600).renew(lease)
+        self.assertIsNotNone(renewed)
+        self.assertGreater(renewed.expires, lease.expires)
+        flags = self.server.mailbox.flags(int(self.uid))
+        self.assertIn(renewed.keyword, flags)
+        self.assertNotIn(lease.keyword, flags)
+
+    def test_renew_after_reclaim_fails(self):
+        lease = LeaseManager(self.reader(), "a", ttl=-5).claim(self.uid)
+        self.assertIsNotNone(LeaseManager(self.reader(), "b").claim(self.uid))
+        self.assertIsNone(LeaseManager(self.reader(), "a").renew(lease))
+
+    def test_seen_message_not_claimed(self):
+        uid = str(self.server.mailbox.add(RAW, flags=["\\Seen"])).encode()
+        self.assertIsNone(LeaseManager(self.reader(), "a").claim(uid))
+
+
+class TestLeaseCondstore(LeaseServerMixin, unittest.TestCase):
+    def test_concurrent_claims_single_winner(self):
+        managers = [LeaseManager(self.reader(), f"w{i}") for i in range(8)]
+        results = [None] * len(managers)
+        barrier = threading.Barrier(len(managers))
+
+        def work(i):
+            barrier.wait()
+            results[i] = managers[i].claim(self.uid)
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(len(managers))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sum(1 for r in results if r is not None), 1)
+
+
+class TestLeaseWithoutCondstore(LeaseServerMixin, unittest.TestCase):
+    condstore = False
+
+
+def _lease_flags(server):
+    return [f for uid in server.mailbox.uids for f in server.mailbox.flags(uid) if f.startswith(LEASE_PREFIX)]
+
+
+@unittest.skipUnless(CLI_AVAILABLE, "click, python-dotenv, pydantic or openai not installed")
+class TestWorkerRun(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.imap = FakeIMAPServer().start()
+        self.llm = FakeOpenAIServer(latency=0.01).start()
+
+    def tearDown(self):
+        self.llm.stop()
+        self.imap.stop()
+        self.tmp.cleanup()
+
+    def add(self, count, flags=()):
+        return [str(self.imap.mailbox.add(RAW, flags=flags)) for _ in range(count)]
+
+    def run_worker(self, *args, **env):
+        return run_cli(self.imap, self.llm, self.tmp.name, args=["run", "--worker-id", "w1", *args], PREFILTER="false", **env)
+
+    def processed(self, output):
+        return [line.split()[2].rstrip(":") for line in output.splitlines() if line.startswith("Processed UID ")]
+
+    def test_two_workers_process_each_uid_once(self):
+        uids = self.add(30)
+        procs = [
+            spawn_cli(self.imap, self.llm, self.tmp.name, args=["run", "--worker-id", f"w{i}"], PREFILTER="false")
+            for i in range(2)
+        ]
+        processed = []
+        for proc in procs:
+            out, err = proc.communicate(timeout=60)
+            self.assertEqual(proc.returncode, 0, err)
+            processed += self.processed(out)
+        self.assertEqual(sorted(processed, key=int), uids)
+        self.assertEqual(self.llm.requests, len(uids))
+        self.assertEqual(_lease_flags(self.imap), [])
+        self.assertTrue(all("\\Seen" in self.imap.mailbox.flags(int(uid)) for uid in uids))
+
+    def test_limit_counts_claims_in_shuffled_order(self):
+        live = make_lease_keyword("other", int(time.time()) + 600)
+        free = self.add(3)
+        taken = self.add(2, flags=[live])
+        # Reverse instead of shuffling so the claim order is known: taken UIDs come first
+        with mock.patch("app.cli.random.shuffle", side_effect=lambda uids: uids.reverse()) as shuffle:
+            result = self.run_worker("--limit", "2")
+        self.assertEqual(result.exit_code, 0, result.output)
+        shuffle.assert_called_once()
+        self.assertEqual(self.processed(result.output), [free[2], free[1]])
+        self.assertEqual(self.llm.requests, 2)
+        for uid in taken:
+            self.assertEqual(self.imap.mailbox.flags(int(uid)), {live})
+
+    def test_lease_lost_during_analyze_drops_result(self):
+        uid = self.add(1)[0]
+        renew = LeaseManager.renew
+        calls = []
+
+        def lose_after_analyze(manager, lease):
+            calls.append(lease)
+            return renew(manager, lease) if len(calls) == 1 else None
+
+        with mock.patch.object(LeaseManager, "renew", autospec=True, side_effect=lose_after_analyze):
+            result = self.run_worker()
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.llm.requests, 1)
+        self.assertIn(f"Lost lease on UID {uid}; dropping the result", result.output)
+        self.assertEqual(self.processed(result.output), [])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "emails")))
+        self.assertNotIn("\\Seen", self.imap.mailbox.flags(int(uid)))
+
+    def test_lease_released_on_error(self):
+        uid = self.add(1)[0]
+        with mock.patch.object(OpenAIEmailProcessor, "analyze", side_effect=RuntimeError("boom")):
+            result = self.run_worker()
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn(f"Error processing UID {uid}: boom", result.output)
+        self.assertEqual(_lease_flags(self.imap), [])
+        self.assertNotIn("\\Seen", self.imap.mailbox.flags(int(uid)))
+
+    def test_requires_mark_seen(self):
+        self.add(1)
+        result = self.run_worker(MARK_SEEN="false")
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("Worker mode requires MARK_SEEN", result.output)
+        self.assertEqual(self.imap.commands, [])
+
+    def test_short_lease_ttl_raised(self):
+        self.add(1)
+        result = self.run_worker(LEASE_TTL="10")
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("LEASE_TTL 10s is too short", result.output)
+        self.assertEqual(self.llm.requests, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+from email import policy
+from email.parser import BytesParser
+
+from app.imap_reader import IMAPReader
+from app.prefilter import DEFAULT_RULES, ROUTE_LLM, ROUTE_LOCAL, ROUTE_SKIP, Prefilter, PrefilterRule
+from tests.fake_imap import FakeIMAPServer
+
+# The CLI needs click, python-dotenv, pydantic and the OpenAI SDK
+try:
+    from tests.cli_runner import run_cli
+    from tests.fake_openai import FakeOpenAIServer
+    CLI_AVAILABLE = True
+except Exception:
+    CLI_AVAILABLE = False
+
+
+def headers_of(*lines):
+    raw = "\r\n".join(list(lines) + ["", ""]).encode("utf-8")
+    return BytesParser(policy=policy.default).parsebytes(raw, headersonly=True)
+
+
+HUMAN = ("From: Alice <alice@example.com>", "To: Bob <bob@example.com>", "Subject: Hi")
+
+
+class TestPrefilterRules(unittest.TestCase):
+    def setUp(self):
+        self.prefilter = Prefilter(DEFAULT_RULES)
+
+    def test_human_mail_goes_to_llm(self):
+        self.assertEqual(self.prefilter.route(headers_of(*HUMAN), 2048), ROUTE_LLM)
+        self.assertEqual(self.prefilter.route(headers_of(*HUMAN, "Auto-Submitted: no")), ROUTE_LLM)
+
+    def test_bulk_and_auto_generated_skipped(self):
+        self.assertEqual(self.prefilter.route(headers_of(*HUMAN, "Auto-Submitted: auto-replied")), ROUTE_SKIP)
+        self.assertEqual(self.prefilter.route(headers_of(*HUMAN, "Precedence: bulk")), ROUTE_SKIP)
+        self.assertEqual(
+            self.prefilter.route(headers_of(*HUMAN, "List-Unsubscribe: <mailto:u@example.com>")), ROUTE_SKIP
+        )
+        bounce = headers_of("From: MAILER-DAEMON@mx.example.com", "Subject: Undelivered")
+        self.assertEqual(self.prefilter.route(bounce), ROUTE_SKIP)
+
+    def test_oversized_routed_local(self):
+        self.assertEqual(self.prefilter.route(headers_of(*HUMAN), 30 * 1024 * 1024), ROUTE_LOCAL)
+
+    def test_malformed_from_does_not_raise(self):
+        # The email package raises AttributeError on both of these
+        for sender in ("From: a <b@[127.0.0.1>", "From: a:b;c:d;"):
+            headers = headers_of(sender, "Subject: Hi")
+            self.assertEqual(self.prefilter.route(headers), ROUTE_LLM)
+            self.assertEqual(self.prefilter.route(headers_of(sender, "Precedence: bulk")), ROUTE_SKIP)
+
+    def test_counters(self):
+        self.prefilter.route(headers_of(*HUMAN, "Precedence: list"))
+        self.prefilter.route(headers_of(*HUMAN, "Precedence: junk"))
+        self.prefilter.route(headers_of(*HUMAN))
+        self.assertEqual(self.prefilter.counts["precedence-bulk"], 2)
+        self.assertEqual(self.prefilter.counts["(default)"], 1)
+        self.assertIn("precedence-bulk: 2 (skip)", self.prefilter.summary())
+
+    def test_from_file(self):
+        config = {
+            "default": "local",
+            "rules": [{"name": "vip", "action": "llm", "from": r"@vip\.example\.com"}],
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "rules.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(config, f)
+            prefilter = Prefilter.from_file(path)
+        self.assertEqual(prefilter.route(headers_of("From: boss@vip.example.com")), ROUTE_LLM)
+        self.assertEqual(prefilter.route(headers_of(*HUMAN)), ROUTE_LOCAL)
+
+    def test_invalid_rule(self):
+        with self.assertRaises(ValueError):
+            Prefilter([{"name": "bad", "action": "drop", "header": "X-Foo"}])
+        with self.assertRaises(ValueError):
+            Prefilter([{"name": "empty", "action": "skip"}])
+        with self.assertRaises(ValueError):
+            Prefilter([{"name": "no-action", "header": "Precedence"}])
+
+    def test_rule_field_types(self):
+        for spec in (
+            {"min_size": "10MB"},
+            {"max_size": 1.5},
+            {"min_size": True},
+            {"header": ["Precedence"]},
+            {"header": "Precedence", "pattern": 5},
+            {"from": None, "header": "X-Foo", "pattern": {"bulk": 1}},
+            {"from": 42},
+        ):
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                PrefilterRule(dict(spec, name="typed", action="skip"))
+
+
+class TestFetchHeaders(unittest.TestCase):
+    def test_headers_without_body(self):
+        with FakeIMAPServer() as server:
+            body = "x" * 5000
+            raw = "\r\n".join(list(HUMAN) + ["Precedence: bulk", "", body, ""]).encode("utf-8")
+            uid = str(server.mailbox.add(raw)).encode()
+            reader = IMAPReader("127.0.0.1", server.port, False, "user", "pass")
+            reader.connect()
+            try:
+                info = reader.fetch_headers([uid])
+            finally:
+                reader.close()
+            headers, size = info[uid]
+            self.assertEqual(headers.get("Precedence"), "bulk")
+            self.assertEqual(size, len(raw))
+            self.assertNotIn(body, headers.as_string())
+            self.assertNotIn("\\Seen", server.mailbox.flags(int(uid)))
+
+
+@unittest.skipUnless(CLI_AVAILABLE, "click, python-dotenv, pydantic or openai not installed")
+class TestRunRouting(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.imap = FakeIMAPServer().start()
+        self.llm = FakeOpenAIServer().start()
+
+    def tearDown(self):
+        self.llm.stop()
+        self.imap.stop()
+        self.tmp.cleanup()
+
+    def add(self, *extra):
+        raw = "\r\n".join(list(HUMAN) + list(extra) + ["", "Body.", ""]).encode("utf-8")
+        return self.imap.mailbox.add(raw)
+
+    def header_fetches(self):
+        return [c for c in self.imap.commands if c.startswith("UID FETCH") and "BODY.PEEK[HEADER]" in c]
+
+    def test_worker_limit_fetches_headers_lazily(self):
+        for _ in range(20):
+            self.add()
+        result = run_cli(self.imap, self.llm, self.tmp.name, args=["run", "--limit", "2", "--worker-id", "w1"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(self.llm.requests, 2)
+        fetched = [uid for c in self.header_fetches() for uid in c.split()[2].split(",")]
+        self.assertEqual(len(fetched), 2)
+
+    def test_skip_marks_seen_without_body_fetch(self):
+        bulk = self.add("Precedence: bulk")
+        human = self.add()
+        result = run_cli(self.imap, self.llm, self.tmp.name)
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn(f"UID STORE {bulk} +FLAGS (\\Seen)", self.imap.commands)
+        self.assertNotIn(f"UID FETCH {bulk} (BODY.PEEK[])", self.imap.commands)
+        self.assertIn("\\Seen", self.imap.mailbox.flags(bulk))
+        self.assertEqual(self.llm.requests, 1)
+        self.assertIn(f"Processed UID {human}:", result.output)
+        self.assertIn("Pre-filter summary:", result.output)
+        self.assertIn("  precedence-bulk: 1 (skip)", result.output)
+        self.assertIn("  (default): 1 (llm)", result.output)
+
+    def test_local_route_skips_openai(self):
+        rules = os.path.join(self.tmp.name, "rules.json")
+        with open(rules, "w", encoding="utf-8") as f:
+            json.dump({"rules": [{"name": "internal", "action": "local", "from": r"@example\.com"}]}, f)
+        uid = self.add()
+        result = run_cli(self.imap, self.llm, self.tmp.name, PREFILTER_RULES=rules)
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(self.llm.requests, 0)
+        self.assertIn(f"Processed UID {uid}:", result.output)
+        self.assertIn("\\Seen", self.imap.mailbox.flags(uid))
+        self.assertIn("  internal: 1 (local)", result.output)
+
+    def test_header_fetch_failure_takes_default_route(self):
+        uid = self.add("Precedence: bulk")
+        with mock.patch.object(IMAPReader, "fetch_headers", side_effect=RuntimeError("header fetch broke")):
+            result = run_cli(self.imap, self.llm, self.tmp.name)
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Error fetching headers: header fetch broke", result.output)
+        # Would have been skipped had the headers arrived
+        self.assertEqual(self.llm.requests, 1)
+        self.assertIn(f"Processed UID {uid}:", result.output)
+        self.assertIn("  (default): 1 (llm)", result.output)
+
+
+if __name__ == "__main__":
+    unittest.main()